@@ -0,0 +1,37 @@
+"""historical rate store
+
+Revision ID: 8b1f0c2d7a41
+Revises: 3efcbc24c80a
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1f0c2d7a41'
+down_revision = '3efcbc24c80a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create historicalrate table
+    op.create_table(
+        'historicalrate',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('base', sa.String(length=3), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('codes', sa.String(), nullable=False),
+        sa.Column('rates', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('base', 'date', name='uq_historicalrate_base_date')
+    )
+    op.create_index(op.f('ix_historicalrate_id'), 'historicalrate', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_historicalrate_id'), table_name='historicalrate')
+    op.drop_table('historicalrate')
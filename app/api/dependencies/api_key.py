@@ -3,18 +3,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.db.session import get_db
-from app.models.user import User
-from app.services.user import get_user_by_api_key
+from app.schemas.user import CachedUser
+from app.services.user import get_cached_user_by_api_key
 
 
 async def get_api_user(
     x_api_key: str = Header(..., description="API Key for authentication"),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> CachedUser:
     """
     Get the current user from the API key.
+    Served from the API key cache; the database is only queried on a miss.
     """
-    user = await get_user_by_api_key(db, x_api_key)
+    user = await get_cached_user_by_api_key(db, x_api_key)
     
     if not user:
         raise HTTPException(
@@ -1,53 +1,80 @@
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.models.user import User
+from app.core.config import settings
+from app.db.session import async_read_session, get_db
+from app.schemas.user import CachedUser
 from app.api.dependencies.api_key import get_api_user
-from app.services.user import deduct_credits
+from app.api.dependencies.unit_of_work import UnitOfWork, get_unit_of_work
+from app.services.user import deduct_credits, get_user_credits
 
 
 async def check_credits(
     credits_required: int,
-    user: User = Depends(get_api_user),
+    user: CachedUser = Depends(get_api_user),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> CachedUser:
     """
     Check if a user has enough credits for an operation.
     Raises an HTTPException if the user doesn't have enough credits.
     """
-    if user.credits < credits_required:
+    available = await get_user_credits(db, user.id)
+    if available < credits_required:
         raise HTTPException(
             status_code=status.HTTP_402_PAYMENT_REQUIRED,
-            detail=f"Not enough credits. Required: {credits_required}, Available: {user.credits}"
+            detail=f"Not enough credits. Required: {credits_required}, Available: {available}"
         )
     
     return user
 
 
-def require_credits(credits_to_deduct: int):
+async def charge_credits(
+    db: AsyncSession,
+    uow: UnitOfWork,
+    user: CachedUser,
+    credits: int
+) -> None:
     """
-    Returns a dependency function that deducts credits from a user's account.
+    Deduct credits for a request, or register the deduction on the unit of work
+    when DB_UNIT_OF_WORK is enabled. Raises a 402 if the user doesn't have enough credits.
     """
-    async def _deduct_user_credits(
-        user: User = Depends(get_api_user),
-        db: AsyncSession = Depends(get_db)
-    ) -> User:
-        # First check if the user has enough credits
-        if user.credits < credits_to_deduct:
+    if settings.DB_UNIT_OF_WORK:
+        # Refuse before any upstream work is done. A short-lived session keeps the request's
+        # session from holding a connection across the provider call; the conditional
+        # UPDATE in finish() remains the authoritative check.
+        required = uow.credits + credits
+        async with async_read_session() as read_db:
+            available = await get_user_credits(read_db, user.id)
+        if available < required:
             raise HTTPException(
                 status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail=f"Not enough credits. Required: {credits_to_deduct}, Available: {user.credits}"
-            )
-        
-        # Deduct the credits
-        success = await deduct_credits(db, user, credits_to_deduct)
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to deduct credits"
+                detail=f"Not enough credits. Required: {required}, Available: {available}"
             )
-        
+        uow.charge(user.id, credits)
+        return
+    
+    # Deduct the credits; the balance is checked against the database, not the cached user
+    remaining = await deduct_credits(db, user.id, credits)
+    if remaining is None:
+        available = await get_user_credits(db, user.id)
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=f"Not enough credits. Required: {credits}, Available: {available}"
+        )
+
+
+def require_credits(credits_to_deduct: int):
+    """
+    Returns a dependency function that deducts credits from a user's account.
+    In unit-of-work mode the deduction is only registered here and applied
+    when the handler finishes the request.
+    """
+    async def _deduct_user_credits(
+        user: CachedUser = Depends(get_api_user),
+        db: AsyncSession = Depends(get_db),
+        uow: UnitOfWork = Depends(get_unit_of_work)
+    ) -> CachedUser:
+        await charge_credits(db, uow, user, credits_to_deduct)
         return user
     
-    return _deduct_user_credits 
\ No newline at end of file
+    return _deduct_user_credits
@@ -0,0 +1,79 @@
+import time
+from typing import Dict, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from app.api.dependencies.api_key import get_api_user
+from app.core.config import settings
+from app.schemas.user import CachedUser
+from app.services.currency_catalogue import CurrencyCatalogue
+from app.services.exchange_rate import exchange_rate_service
+from app.services.rate_engine import RateTable
+
+
+def rate_table_validators(table: RateTable) -> Tuple[str, int]:
+    """Return the ETag of a rate table and how many seconds clients may reuse it."""
+    expires_at = table.fetched_at + settings.RATE_CACHE_TTL
+    if table.next_update:
+        expires_at = min(expires_at, table.next_update)
+    return f'"rates-{table.fingerprint}"', max(0, int(expires_at - time.time()))
+
+
+def currencies_validators(catalogue: CurrencyCatalogue) -> Tuple[str, int]:
+    """Return the ETag of a currency catalogue and how many seconds clients may reuse it."""
+    return f'"currencies-{catalogue.fingerprint}"', settings.CURRENCIES_MAX_AGE
+
+
+def cache_headers(etag: str, max_age: int) -> Dict[str, str]:
+    # Responses depend on the caller's API key, so only private caches may store them
+    return {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+
+
+def set_cache_headers(response: Response, etag: str, max_age: int):
+    response.headers.update(cache_headers(etag, max_age))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header names the given ETag (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str, max_age: int) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, max_age))
+
+
+async def check_rate_table_etag(request: Request, user: CachedUser = Depends(get_api_user)) -> None:
+    """
+    Answer 304 Not Modified when the client already holds a response computed
+    from the rate table currently being served. Only the in-memory snapshot
+    is consulted, so the service layer is not called.
+    Declared on the route so it runs before any credits are deducted: a 304
+    is not charged. Depends on the API user so that only authenticated
+    requests are answered.
+    """
+    snapshot = exchange_rate_service.snapshot
+    if snapshot is None or snapshot.is_expired:
+        return
+    
+    etag, max_age = rate_table_validators(snapshot)
+    if etag_matches(request, etag):
+        raise not_modified(etag, max_age)
+
+
+async def check_currencies_etag(request: Request, user: CachedUser = Depends(get_api_user)) -> None:
+    """Answer 304 Not Modified when the client holds the current currency catalogue."""
+    catalogue = exchange_rate_service.catalogue
+    if catalogue is None:
+        return
+    
+    etag, max_age = currencies_validators(catalogue)
+    if etag_matches(request, etag):
+        raise not_modified(etag, max_age)
@@ -1,43 +1,58 @@
-from fastapi import Depends, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import logging
 
-from app.models.user import User
-from app.services.user import get_user_by_api_key
+from fastapi import Depends, HTTPException, status
 
+from app.api.dependencies.api_key import get_api_user
+from app.core.config import settings
+from app.core.metrics import rate_limiter_errors
+from app.schemas.user import CachedUser
+from app.services.rate_limiter import rate_limiter
 
-# Create a limiter instance
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
 
 
-async def get_user_rate_limit(request: Request) -> int:
+# Rate limits are requests per minute, as stored on the plan
+RATE_LIMIT_PERIOD = 60
+
+
+def get_user_rate_limit(user: CachedUser) -> int:
     """
     Return the rate limit for a user based on their plan.
-    Used by the slowapi decorator to determine the rate limit.
+    Defaults to the lowest rate limit if the user has no plan.
+    """
+    if not user.plan or not user.plan.rate_limit:
+        return settings.DEFAULT_RATE_LIMIT
+    
+    return user.plan.rate_limit
+
+
+async def enforce_rate_limit(user: CachedUser = Depends(get_api_user)) -> CachedUser:
+    """
+    Enforce the per-plan rate limit for the API user.
+    Declared on the route so it runs before any credits are deducted.
     
-    IMPORTANT: This function must only take the request parameter
-    when used with @limiter.limit().
+    Fails open: if the limiter backend cannot be reached (e.g. Redis is down)
+    the request is let through, with a warning and a rate_limiter_errors_total
+    increment, so a limiter outage does not take every endpoint down.
+    Credits are still checked as usual.
     """
-    # Get API key from header
-    api_key = request.headers.get("x-api-key")
-    if not api_key:
-        # Default to lowest rate limit if no API key
-        return 10
+    limit = get_user_rate_limit(user)
+    try:
+        result = await rate_limiter.hit(f"user:{user.id}", limit, RATE_LIMIT_PERIOD)
+    except Exception as e:
+        logger.warning("Rate limiter unavailable, allowing request: %s", e)
+        rate_limiter_errors.inc()
+        return user
     
-    # Get DB session from request state
-    # SlowAPI needs this function to only take request as a parameter,
-    # so we need to manually get the DB session
-    from app.db.session import async_session
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded: {limit} per minute",
+            headers={
+                "Retry-After": str(max(1, round(result.retry_after))),
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0",
+            },
+        )
     
-    async with async_session() as db:
-        # Get user from API key
-        user = await get_user_by_api_key(db, api_key)
-        if not user or not user.plan:
-            # Default to lowest rate limit if user or plan not found
-            return 10
-            
-        # Store the user in the request state for later use
-        request.state.user = user
-        
-        # Return the rate limit from the user's plan
-        return user.plan.rate_limit 
\ No newline at end of file
+    return user
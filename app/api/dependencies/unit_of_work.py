@@ -0,0 +1,68 @@
+import time
+from typing import Any, Optional
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import request_log_commit_duration
+from app.db.session import get_db
+from app.models.user import RequestLog
+from app.services.request_log import request_log_writer
+from app.services.user import deduct_credits, get_user_credits
+
+_commit_timer = request_log_commit_duration.labels("unit_of_work")
+
+
+class UnitOfWork:
+    """
+    Collects the writes of one request so they can be applied in a single transaction.
+    
+    With DB_UNIT_OF_WORK enabled, the credit deduction registered by
+    require_credits and the request log row are written together by finish():
+    one UPDATE ... RETURNING, one INSERT and exactly one commit on the request's
+    session. Requests that fail before finish() are neither charged nor logged.
+    The balance is also read when the charge is registered, so users without
+    enough credits are refused before any upstream call.
+    Otherwise credits are deducted up front and the log row goes through the
+    batched request log writer.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.user_id: Optional[int] = None
+        self.credits = 0
+    
+    def charge(self, user_id: int, credits: int):
+        """Register a credit deduction to be applied by finish()."""
+        self.user_id = user_id
+        self.credits += credits
+    
+    async def finish(self, **log_fields: Any):
+        """Apply the pending credit deduction and write the request log."""
+        if not settings.DB_UNIT_OF_WORK:
+            await request_log_writer.write(**log_fields)
+            return
+        
+        if self.credits:
+            remaining = await deduct_credits(self.db, self.user_id, self.credits, commit=False)
+            if remaining is None:
+                available = await get_user_credits(self.db, self.user_id)
+                raise HTTPException(
+                    status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                    detail=f"Not enough credits. Required: {self.credits}, Available: {available}"
+                )
+        
+        started = time.perf_counter()
+        self.db.add(RequestLog(**log_fields))
+        await self.db.commit()
+        _commit_timer.observe_since(started)
+        self.credits = 0
+
+
+async def get_unit_of_work(db: AsyncSession = Depends(get_db)) -> UnitOfWork:
+    """
+    Dependency for the request's unit of work. It shares the request's cached
+    get_db session with the other dependencies.
+    """
+    return UnitOfWork(db)
@@ -0,0 +1,44 @@
+from typing import Any, Type
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+
+def validate_query(model: Type[BaseModel]):
+    """
+    Returns a dependency that validates the query string against a request
+    schema and rejects invalid requests with a 422 straight away.
+    FastAPI only reports parameter errors after every dependency has run, so
+    without this a request with bad parameters would still be charged credits.
+    Declare it first in the route's dependencies, so invalid requests do no
+    rate limiting, API key lookup or credit check.
+    """
+    async def _validate_query(request: Request) -> None:
+        try:
+            model.model_validate(dict(request.query_params))
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("query", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+    
+    return _validate_query
+
+
+def validate_body(annotation: Any):
+    """
+    Returns a dependency that validates the JSON body against a type, like
+    validate_query does for the query string. FastAPI parses the body before
+    solving dependencies, so this reads the already decoded JSON.
+    """
+    adapter = TypeAdapter(annotation)
+    
+    async def _validate_body(request: Request) -> None:
+        try:
+            adapter.validate_python(await request.json())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+    
+    return _validate_body
@@ -1,34 +1,64 @@
+import json
 from datetime import date, datetime, timedelta
-from typing import Dict, Optional
+from typing import Annotated, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from pydantic import Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies.api_key import get_api_user
-from app.api.dependencies.credits import require_credits
-from app.api.dependencies.rate_limit import limiter
+from app.api.dependencies.credits import charge_credits, require_credits
+from app.api.dependencies.http_cache import (
+    cache_headers, check_currencies_etag, check_rate_table_etag, currencies_validators,
+    rate_table_validators, set_cache_headers,
+)
+from app.api.dependencies.unit_of_work import UnitOfWork, get_unit_of_work
+from app.api.dependencies.validation import validate_body, validate_query
+from app.api.dependencies.rate_limit import enforce_rate_limit
+from app.api.responses import fast_json
 from app.core.config import settings
 from app.db.session import get_db
-from app.models.user import User, RequestLog
-from app.schemas.currency import CurrencyList, ConversionRequest, ConversionResult, HistoricalConversionResult
+from app.schemas.currency import (
+    CurrencyList, ConversionQuery, ConversionRequest, ConversionResult, HistoricalConversionQuery,
+    HistoricalConversionResult, BatchConversionItem, BatchConversionResult, RateMatrix, RateMatrixQuery,
+)
+from app.schemas.user import CachedUser
+from app.services.conversion import convert_pairs, convert_series, rate_matrix_json
 from app.services.exchange_rate import exchange_rate_service
+from app.services.rate_engine import RateSeries
 
 router = APIRouter()
 
+# Row formats /convert/historical can stream instead of a single JSON document
+STREAMING_MEDIA_TYPES = ("application/x-ndjson", "text/csv")
 
-@router.get("/currencies", response_model=CurrencyList)
-@limiter.limit("1000/day")
+BatchConversions = Annotated[
+    List[BatchConversionItem], Field(min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+]
+
+
+@router.get(
+    "/currencies",
+    response_model=CurrencyList,
+    dependencies=[Depends(enforce_rate_limit), Depends(check_currencies_etag)]
+)
 async def get_currencies(
     request: Request,
-    user: User = Depends(get_api_user)
+    user: CachedUser = Depends(get_api_user)
 ):
     """
     Get a list of all supported currencies.
     This endpoint doesn't consume credits.
     """
     try:
-        currencies = await exchange_rate_service.get_currencies()
-        return {"currencies": currencies}
+        catalogue = await exchange_rate_service.get_catalogue()
+        # The catalogue holds its serialized body, so the response is a copy of cached bytes
+        return Response(
+            content=catalogue.payload,
+            media_type="application/json",
+            headers=cache_headers(*currencies_validators(catalogue))
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -36,34 +66,39 @@ async def get_currencies(
         )
 
 
-def get_api_key(request: Request) -> str:
-    """Extract API key from request headers"""
-    return request.headers.get("x-api-key", "none")
-
-
-@router.get("/convert", response_model=ConversionResult)
-@limiter.limit("5 per minute", key_func=get_api_key)
+@router.get(
+    "/convert",
+    response_model=ConversionResult,
+    dependencies=[
+        Depends(validate_query(ConversionQuery)),
+        Depends(enforce_rate_limit),
+        Depends(check_rate_table_etag),
+    ]
+)
 async def convert_currency(
     request: Request,
-    from_currency: str = Query(..., description="Currency code to convert from"),
-    to_currency: str = Query(..., description="Currency code to convert to"),
-    amount: float = Query(..., description="Amount to convert"),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(require_credits(settings.CREDITS_PER_CONVERSION))
+    response: Response,
+    query: Annotated[ConversionQuery, Query()],
+    user: CachedUser = Depends(require_credits(settings.CREDITS_PER_CONVERSION)),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """
     Convert an amount from one currency to another.
-    Consumes 1 credit per request.
+    Consumes 1 credit per request; a 304 Not Modified is not charged.
+    Unsupported currency codes are rejected with a 422 before any credits are deducted.
     """
+    from_currency, to_currency, amount = query.from_currency, query.to_currency, query.amount
     try:
-        # Get the conversion rate
-        rate = await exchange_rate_service.get_latest_rate(from_currency, to_currency)
+        # Derive the conversion rate from the pivot rate table
+        rate_table = await exchange_rate_service.get_rate_table()
+        rate = rate_table.rate(from_currency, to_currency)
+        set_cache_headers(response, *rate_table_validators(rate_table))
         
         # Calculate the converted amount
         converted_amount = amount * rate
         
         # Log the request
-        log = RequestLog(
+        await uow.finish(
             user_id=user.id,
             endpoint="/convert",
             request_data=f"from={from_currency}, to={to_currency}, amount={amount}",
@@ -71,51 +106,194 @@ async def convert_currency(
             status_code=200,
             credits_deducted=settings.CREDITS_PER_CONVERSION
         )
-        db.add(log)
-        await db.commit()
         
-        return {
+        return fast_json({
             "from_currency": from_currency,
             "to_currency": to_currency,
             "amount": amount,
             "converted_amount": converted_amount,
             "rate": rate,
             "date": None  # Current date is implied
+        }, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.post(
+    "/convert/batch",
+    response_model=BatchConversionResult,
+    dependencies=[Depends(validate_body(BatchConversions)), Depends(enforce_rate_limit)]
+)
+async def convert_batch(
+    request: Request,
+    conversions: List[BatchConversionItem] = Body(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_MAX_ITEMS,
+        description="Conversions to perform, in order",
+    ),
+    user: CachedUser = Depends(get_api_user),
+    db: AsyncSession = Depends(get_db),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    """
+    Convert many amounts in one call.
+    Consumes 1 credit per conversion, deducted in a single statement, and
+    writes one aggregated request log row.
+    Empty or oversized batches and unsupported currency codes are rejected
+    with a 422 before any rates are looked up or credits deducted.
+    """
+    try:
+        # One rate table lookup serves every pair in the batch
+        rate_table = await exchange_rate_service.get_rate_table()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    
+    # Codes are checked against the catalogue on input; this only catches a
+    # currency the catalogue lists but the current rate table lacks
+    unsupported = sorted({
+        code
+        for item in conversions
+        for code in (item.from_currency, item.to_currency)
+        if not rate_table.supports(code)
+    })
+    if unsupported:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported currencies: {', '.join(unsupported)}"
+        )
+    
+    credits = settings.CREDITS_PER_CONVERSION * len(conversions)
+    await charge_credits(db, uow, user, credits)
+    
+    # Price the whole batch in one vectorized pass
+    rates, converted_amounts = convert_pairs(
+        rate_table,
+        [item.from_currency for item in conversions],
+        [item.to_currency for item in conversions],
+        [item.amount for item in conversions],
+    )
+    results = [
+        {
+            "from_currency": item.from_currency,
+            "to_currency": item.to_currency,
+            "amount": item.amount,
+            "converted_amount": converted_amount,
+            "rate": rate,
+            "date": None
         }
+        for item, rate, converted_amount in zip(conversions, rates.tolist(), converted_amounts.tolist())
+    ]
+    
+    # Log the whole batch as one request
+    pairs = {(item.from_currency, item.to_currency) for item in conversions}
+    await uow.finish(
+        user_id=user.id,
+        endpoint="/convert/batch",
+        request_data=f"conversions={len(conversions)}, pairs={len(pairs)}",
+        response_data=f"converted={len(results)}",
+        status_code=200,
+        credits_deducted=credits
+    )
+    
+    return fast_json({"results": results})
+
+
+@router.get(
+    "/matrix",
+    response_model=RateMatrix,
+    dependencies=[
+        Depends(validate_query(RateMatrixQuery)),
+        Depends(enforce_rate_limit),
+        Depends(check_rate_table_etag),
+    ]
+)
+async def get_rate_matrix(
+    request: Request,
+    query: Annotated[RateMatrixQuery, Query()],
+    user: CachedUser = Depends(get_api_user),
+    db: AsyncSession = Depends(get_db),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    """
+    Get the cross-rate matrix between base and target currencies from the latest rate snapshot.
+    The rates are returned row-major: one row of targets per base.
+    Consumes 1 credit per request; a 304 Not Modified is not charged.
+    Unsupported currency codes are rejected with a 422 before any credits are deducted.
+    """
+    try:
+        rate_table = await exchange_rate_service.get_rate_table()
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+    
+    base_codes = tuple(query.bases.split(",")) if query.bases else rate_table.codes
+    target_codes = tuple(query.targets.split(",")) if query.targets else rate_table.codes
+    
+    # Codes are checked against the catalogue on input; this only catches a
+    # currency the catalogue lists but the current rate table lacks
+    unsupported = sorted({code for code in base_codes + target_codes if not rate_table.supports(code)})
+    if unsupported:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported currencies: {', '.join(unsupported)}"
+        )
+    
+    await charge_credits(db, uow, user, settings.CREDITS_PER_MATRIX)
+    
+    payload = rate_matrix_json(rate_table, base_codes, target_codes)
+    
+    await uow.finish(
+        user_id=user.id,
+        endpoint="/matrix",
+        request_data=f"bases={len(base_codes)}, targets={len(target_codes)}",
+        response_data=f"fingerprint={rate_table.fingerprint}",
+        status_code=200,
+        credits_deducted=settings.CREDITS_PER_MATRIX
+    )
+    
+    # Already serialized (and memoized per snapshot), so skip response model validation
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers=cache_headers(*rate_table_validators(rate_table))
+    )
 
 
-@router.get("/convert/historical", response_model=HistoricalConversionResult)
-@limiter.limit("5 per minute", key_func=get_api_key)
+@router.get(
+    "/convert/historical",
+    response_model=HistoricalConversionResult,
+    dependencies=[Depends(validate_query(HistoricalConversionQuery)), Depends(enforce_rate_limit)]
+)
 async def convert_historical(
     request: Request,
-    from_currency: str = Query(..., description="Currency code to convert from"),
-    to_currency: str = Query(..., description="Currency code to convert to"),
-    amount: float = Query(..., description="Amount to convert"),
-    start_date: date = Query(..., description="Start date (YYYY-MM-DD), must be within the last year"),
-    end_date: date = Query(..., description="End date (YYYY-MM-DD), cannot be in the future"),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(require_credits(settings.CREDITS_PER_HISTORICAL))
+    response: Response,
+    query: Annotated[HistoricalConversionQuery, Query()],
+    user: CachedUser = Depends(require_credits(settings.CREDITS_PER_HISTORICAL)),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """
-    Get historical conversion rates for a specified period.
-    Consumes 1 credit per request.
+    Get historical conversion rates for a specified period, to one or more
+    target currencies. Consumes 1 credit per request, however many targets.
+    Invalid currency codes or dates are rejected with a 422 before any credits are deducted.
     
     Note: This API only supports historical data from the past year.
     The end date cannot be in the future.
     """
+    from_currency, to_currency, amount = query.from_currency, query.to_currency, query.amount
+    start_date, end_date = query.start_date, query.end_date
+    targets = tuple(to_currency.split(","))
     try:
-        # Validate dates
-        if start_date > end_date:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Start date must be before or equal to end date"
-            )
-        
         # Automatically adjust date ranges for better user experience
         today = date.today()
         
@@ -132,12 +310,12 @@ async def convert_historical(
         
         # Get historical rates
         try:
-            historical_rates = await exchange_rate_service.get_historical_rates(
-                from_currency, to_currency, start_date, end_date
+            series = await exchange_rate_service.get_historical_rates(
+                from_currency, targets, start_date, end_date
             )
             
             # If we got an empty result and dates were adjusted, let the user know
-            if not historical_rates:
+            if not series:
                 # If both dates were adjusted
                 if original_start_date != start_date and original_end_date != end_date:
                     note = f"Note: Your dates were adjusted from {original_start_date} - {original_end_date} to {start_date} - {end_date} to comply with API limits."
@@ -167,35 +345,63 @@ async def convert_historical(
                     detail=f"Exchange rate API error: {str(e)}"
                 )
         
-        # Calculate converted amounts for each date
-        converted_amounts = {}
-        for date_str, rates in historical_rates.items():
-            if to_currency in rates:
-                converted_amounts[date_str] = amount * rates[to_currency]
+        # The format depends on the Accept header, so caches must key on it
+        response.headers["Vary"] = "Accept"
+        media_type = _streaming_media_type(request)
+        if media_type is not None:
+            await uow.finish(
+                user_id=user.id,
+                endpoint="/convert/historical",
+                request_data=f"from={from_currency}, to={to_currency}, amount={amount}, "
+                             f"start_date={start_date}, end_date={end_date}",
+                response_data=f"dates_returned={len(series)}, format={media_type}",
+                status_code=200,
+                credits_deducted=settings.CREDITS_PER_HISTORICAL
+            )
+            return StreamingResponse(
+                _historical_rows(media_type, from_currency, amount, series),
+                media_type=media_type,
+                headers=response.headers
+            )
+        
+        # Calculate converted amounts for every target in one pass per column
+        dates = series.dates
+        rate_columns = {code: column.tolist() for code, column in series.columns.items()}
+        amount_columns = {code: convert_series(column, amount).tolist() for code, column in series.columns.items()}
+        
+        historical_rates = {
+            date_str: {code: rate_columns[code][i] for code in targets}
+            for i, date_str in enumerate(dates)
+        }
+        if len(targets) == 1:
+            converted_amounts = dict(zip(dates, amount_columns[targets[0]]))
+        else:
+            converted_amounts = {
+                date_str: {code: amount_columns[code][i] for code in targets}
+                for i, date_str in enumerate(dates)
+            }
         
         # Log the request
-        log = RequestLog(
+        await uow.finish(
             user_id=user.id,
             endpoint="/convert/historical",
             request_data=f"from={from_currency}, to={to_currency}, amount={amount}, "
                          f"start_date={start_date}, end_date={end_date}",
-            response_data=f"dates_returned={len(historical_rates)}",
+            response_data=f"dates_returned={len(series)}",
             status_code=200,
             credits_deducted=settings.CREDITS_PER_HISTORICAL
         )
-        db.add(log)
-        await db.commit()
         
         # Add a note about date adjustment for the response
         result = {
             "from_currency": from_currency,
-            "to_currency": to_currency,
+            "to_currency": ",".join(targets),
             "amount": amount,
             "rates": historical_rates,
             "converted_amounts": converted_amounts
         }
         
-        return result
+        return fast_json(result, response)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -203,4 +409,91 @@ async def convert_historical(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """Split an Accept header into (media range, q) pairs, in header order."""
+    ranges = []
+    for part in accept.split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_range.lower(), quality))
+    return ranges
+
+
+def _streaming_media_type(request: Request) -> Optional[str]:
+    """
+    Negotiate the /convert/historical format from the Accept header and
+    return the streaming media type to use, or None for the JSON document.
+    Each format takes the q-value of its most specific matching range, and
+    q=0 excludes it. The highest q wins, then the earliest range in the
+    header. Streaming formats must be named explicitly; wildcards alone get JSON.
+    """
+    ranges = _parse_accept(request.headers.get("accept", ""))
+    
+    choices = []
+    for media_type in ("application/json", *STREAMING_MEDIA_TYPES):
+        match = None
+        for position, (media_range, quality) in enumerate(ranges):
+            if media_range == media_type:
+                specificity = 2
+            elif media_range == media_type.split("/")[0] + "/*":
+                specificity = 1
+            elif media_range == "*/*":
+                specificity = 0
+            else:
+                continue
+            if match is None or specificity > match[0]:
+                match = (specificity, quality, position)
+        
+        if match is None or match[1] <= 0:
+            continue
+        if media_type in STREAMING_MEDIA_TYPES and match[0] < 2:
+            continue
+        choices.append((-match[1], match[2], media_type))
+    
+    if not choices:
+        return None
+    media_type = min(choices)[2]
+    return media_type if media_type in STREAMING_MEDIA_TYPES else None
+
+
+async def _historical_rows(
+    media_type: str,
+    from_currency: str,
+    amount: float,
+    series: RateSeries
+) -> AsyncIterator[str]:
+    """
+    Yield one encoded row per date and target, converting as each row is
+    written, so the response never holds more than one row besides the
+    rate columns themselves.
+    """
+    csv = media_type == "text/csv"
+    if csv:
+        yield "date,from_currency,to_currency,rate,converted_amount\n"
+    
+    columns = series.columns
+    for i, date_str in enumerate(series.dates):
+        for to_currency, column in columns.items():
+            rate = column[i]
+            if csv:
+                yield f"{date_str},{from_currency},{to_currency},{rate!r},{amount * rate!r}\n"
+            else:
+                yield json.dumps({
+                    "date": date_str,
+                    "from_currency": from_currency,
+                    "to_currency": to_currency,
+                    "rate": rate,
+                    "converted_amount": amount * rate,
+                }, separators=(",", ":")) + "\n"
@@ -0,0 +1,29 @@
+"""
+Fast JSON responses for the currency endpoints.
+
+With FAST_JSON_ENABLED, handlers pass their results through fast_json(),
+which encodes them with orjson straight into a response. Returning a
+Response makes FastAPI skip response_model validation and jsonable_encoder,
+so only results whose types already match the route's response model may go
+through it; response_model stays on the routes for the OpenAPI schema.
+"""
+from importlib.util import find_spec
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+from app.core.config import settings
+
+# orjson is optional; without it the validated response path is used
+FAST_JSON = settings.FAST_JSON_ENABLED and find_spec("orjson") is not None
+
+
+def fast_json(content: Any, response: Optional[Response] = None) -> Any:
+    """
+    Return an orjson-encoded response on the fast path, otherwise the content
+    unchanged. Headers set on the route's injected response are carried over.
+    """
+    if FAST_JSON:
+        return ORJSONResponse(content, headers=response.headers if response is not None else None)
+    return content
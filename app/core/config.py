@@ -12,6 +12,48 @@ class Settings(BaseModel):
     EXCHANGE_API_KEY: str = os.environ.get("EXCHANGE_API_KEY", "3afdfcec62a73d0467a5ae1e")
     EXCHANGE_API_BASE_URL: str = os.environ.get("EXCHANGE_API_BASE_URL", "https://v6.exchangerate-api.com/v6/")
     
+    # Upstream HTTP client settings (shared connection pool)
+    HTTP_MAX_CONNECTIONS: int = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3"))
+    HTTP_READ_TIMEOUT: float = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+    HTTP_WRITE_TIMEOUT: float = float(os.environ.get("HTTP_WRITE_TIMEOUT", "5"))
+    HTTP_POOL_TIMEOUT: float = float(os.environ.get("HTTP_POOL_TIMEOUT", "5"))
+    HTTP2_ENABLED: bool = os.environ.get("HTTP2_ENABLED", "true").lower() == "true"
+    
+    # Upstream resilience: overall deadline per call including retries (seconds), retries of
+    # failed GETs with jittered exponential backoff, and the circuit breaker that fails fast
+    UPSTREAM_DEADLINE: float = float(os.environ.get("UPSTREAM_DEADLINE", "8"))
+    UPSTREAM_MAX_RETRIES: int = int(os.environ.get("UPSTREAM_MAX_RETRIES", "2"))
+    UPSTREAM_RETRY_BASE_DELAY: float = float(os.environ.get("UPSTREAM_RETRY_BASE_DELAY", "0.2"))
+    UPSTREAM_RETRY_MAX_DELAY: float = float(os.environ.get("UPSTREAM_RETRY_MAX_DELAY", "2"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.environ.get("CIRCUIT_RESET_TIMEOUT", "30"))
+    
+    # All cross rates are derived from a single table quoted against this currency
+    RATE_PIVOT_CURRENCY: str = os.environ.get("RATE_PIVOT_CURRENCY", "USD")
+    
+    # Rate table cache (seconds); entries also expire at the provider's next update time
+    RATE_CACHE_TTL: float = float(os.environ.get("RATE_CACHE_TTL", "3600"))
+    RATE_CACHE_MIN_TTL: float = float(os.environ.get("RATE_CACHE_MIN_TTL", "60"))
+    RATE_CACHE_MAX_ENTRIES: int = int(os.environ.get("RATE_CACHE_MAX_ENTRIES", "200"))
+    
+    # Currency list: background refresh interval, and how long clients may reuse it (seconds)
+    CURRENCIES_REFRESH_INTERVAL: float = float(os.environ.get("CURRENCIES_REFRESH_INTERVAL", "86400"))
+    CURRENCIES_MAX_AGE: int = int(os.environ.get("CURRENCIES_MAX_AGE", "3600"))
+    
+    # Background refresh of the rate table (seconds); stale tables are served up to RATE_MAX_STALENESS
+    RATE_REFRESH_ENABLED: bool = os.environ.get("RATE_REFRESH_ENABLED", "true").lower() == "true"
+    RATE_REFRESH_INTERVAL: float = float(os.environ.get("RATE_REFRESH_INTERVAL", "900"))
+    RATE_REFRESH_RETRY_INTERVAL: float = float(os.environ.get("RATE_REFRESH_RETRY_INTERVAL", "30"))
+    RATE_MAX_STALENESS: float = float(os.environ.get("RATE_MAX_STALENESS", "86400"))
+    
+    # Keep fetched historical rates in the database and only request missing dates upstream
+    HISTORY_STORE_ENABLED: bool = os.environ.get("HISTORY_STORE_ENABLED", "true").lower() == "true"
+    # UTC days after which a date the provider still has no rates for is stored as "no data"
+    HISTORY_SETTLE_DAYS: int = int(os.environ.get("HISTORY_SETTLE_DAYS", "3"))
+    
     # Plan defaults
     PLANS: Dict[str, Dict[str, Any]] = {
         "free": {"name": "Free", "rate_limit": 10, "initial_credits": 100},
@@ -19,9 +61,53 @@ class Settings(BaseModel):
         "diamond": {"name": "Diamond", "rate_limit": 120, "initial_credits": 5000},
     }
     
+    # API key -> user/plan snapshot cache (seconds); bounds staleness across workers
+    API_KEY_CACHE_TTL: float = float(os.environ.get("API_KEY_CACHE_TTL", "60"))
+    API_KEY_CACHE_MAX_ENTRIES: int = int(os.environ.get("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Application log level and format ("json" lines or human-readable "text")
+    LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.environ.get("LOG_FORMAT", "json").lower()
+    
+    # Prometheus metrics on /metrics and per-route request timing
+    METRICS_ENABLED: bool = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Encode currency responses with orjson and skip response model re-validation
+    FAST_JSON_ENABLED: bool = os.environ.get("FAST_JSON_ENABLED", "false").lower() == "true"
+    
+    # Database connection pool; DB_STATEMENT_TIMEOUT_MS=0 leaves the server default (PostgreSQL only)
+    DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+    DB_POOL_RECYCLE: int = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_CACHE_SIZE: int = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "500"))
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    
+    # Apply the credit deduction and request log of a request in one transaction and commit
+    DB_UNIT_OF_WORK: bool = os.environ.get("DB_UNIT_OF_WORK", "false").lower() == "true"
+    
+    # Batched request log writer (used when DB_UNIT_OF_WORK is off)
+    REQUEST_LOG_QUEUE_SIZE: int = int(os.environ.get("REQUEST_LOG_QUEUE_SIZE", "10000"))
+    REQUEST_LOG_BATCH_SIZE: int = int(os.environ.get("REQUEST_LOG_BATCH_SIZE", "500"))
+    REQUEST_LOG_FLUSH_INTERVAL: float = float(os.environ.get("REQUEST_LOG_FLUSH_INTERVAL", "1.0"))
+    REQUEST_LOG_ENQUEUE_TIMEOUT: float = float(os.environ.get("REQUEST_LOG_ENQUEUE_TIMEOUT", "0.05"))
+    
+    # Rate limiting backend: "memory://" (per worker) or a redis:// URL (shared across workers)
+    RATE_LIMIT_STORAGE_URL: str = os.environ.get("RATE_LIMIT_STORAGE_URL", "memory://")
+    DEFAULT_RATE_LIMIT: int = int(os.environ.get("DEFAULT_RATE_LIMIT", "10"))
+    
     # Credits per request
     CREDITS_PER_CONVERSION: int = 1
     CREDITS_PER_HISTORICAL: int = 1
+    
+    CREDITS_PER_MATRIX: int = 1
+    
+    # Memoized cross-rate matrices (distinct bases/targets selections kept per rate table)
+    MATRIX_CACHE_MAX_ENTRIES: int = int(os.environ.get("MATRIX_CACHE_MAX_ENTRIES", "64"))
+    
+    # Largest number of conversions accepted by /convert/batch (each costs CREDITS_PER_CONVERSION)
+    BATCH_MAX_ITEMS: int = int(os.environ.get("BATCH_MAX_ITEMS", "1000"))
 
 
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+Minimal Prometheus-style metrics.
+
+Counters and histograms are plain Python numbers updated from the event
+loop, so recording a value is a dict lookup and an addition: no locks and no
+background thread. Label sets are resolved once with labels() and the child
+can be kept by the caller. Values that other components already track
+(cache and pool statistics) are sampled at scrape time by collectors instead
+of being counted twice.
+
+Each worker process exposes its own values; aggregate across workers in
+Prometheus.
+"""
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A collector yields (name, type, help, [(labels, value), ...]) at scrape time
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_since(self, started: float):
+        """Record the time elapsed since a time.perf_counter() reading."""
+        self.observe(time.perf_counter() - started)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Return the child for a label set, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_dict(self, values: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        """Increment the unlabelled counter."""
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self._label_dict(values))} {_format_value(child.value)}"
+            for values, child in self._children.items()
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        """Record a value on the unlabelled histogram."""
+        self.labels().observe(value)
+
+    def observe_since(self, started: float):
+        """Record the time elapsed since a time.perf_counter() reading on the unlabelled histogram."""
+        self.labels().observe_since(started)
+
+    def render(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            labels = self._label_dict(values)
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), child.counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {child.count}")
+        return lines
+
+
+class Registry:
+    """Holds the metrics and collectors exposed on /metrics."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector):
+        """Register a function sampled at scrape time, e.g. to export existing stats() counters."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                logger.exception("Metrics collector failed")
+                continue
+            for name, type_name, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Hot-path timers; the label values used are documented next to each call site
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+auth_lookup_duration = registry.histogram(
+    "auth_lookup_duration_seconds", "API key lookup time, by where the user was found.", ("source",)
+)
+credit_deduction_duration = registry.histogram(
+    "credit_deduction_duration_seconds", "Time spent deducting credits in the database."
+)
+upstream_request_duration = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Exchange rate provider request time, by provider method and HTTP status.",
+    ("method", "status"),
+)
+request_log_commit_duration = registry.histogram(
+    "request_log_commit_duration_seconds",
+    "Time spent committing request logs, by writer mode.",
+    ("mode",),
+)
+upstream_retries = registry.counter(
+    "upstream_retries_total", "Exchange rate provider requests retried, by provider method.", ("method",)
+)
+circuit_transitions = registry.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes.", ("circuit", "from_state", "to_state")
+)
+circuit_rejections = registry.counter(
+    "circuit_breaker_rejections_total", "Calls refused while a circuit was open.", ("circuit",)
+)
+rate_limiter_errors = registry.counter(
+    "rate_limiter_errors_total", "Rate limit checks that failed and let the request through."
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording a latency histogram and a status counter
+    per route template (e.g. /api/v1/currency/convert), so query strings and
+    unknown paths do not create new label values.
+    """
+
+    def __init__(self, app, exclude_paths: Sequence[str] = ()):
+        self.app = app
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_duration.labels(method, path).observe_since(started)
+            http_requests.labels(method, path, str(status_code)).inc()
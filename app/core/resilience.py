@@ -0,0 +1,98 @@
+"""
+Circuit breaker and retry backoff for calls to external services.
+
+Like the caches, these are plain objects used from the event loop only, so
+state changes need no locks.
+"""
+import logging
+import random
+import time
+from typing import Any, Dict
+
+from app.core.metrics import circuit_rejections, circuit_transitions
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Exported as a gauge value
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service after `failure_threshold` consecutive failures.
+    While open, calls fail fast with CircuitOpenError; after `reset_timeout`
+    seconds a single probe call is let through (half-open), which closes the
+    circuit on success or opens it again on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+        self._rejections = circuit_rejections.labels(name)
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be made now."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self._reject()
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self._reject()
+            self._probing = True
+
+    def record_success(self):
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def release(self):
+        """Forget a call that was cancelled before it succeeded or failed."""
+        self._probing = False
+
+    def _reject(self):
+        self.rejected += 1
+        self._rejections.inc()
+        raise CircuitOpenError(f"{self.name} circuit is open after {self.failures} consecutive failures")
+
+    def _transition(self, state: str):
+        logger.warning("Circuit %s: %s -> %s", self.name, self.state, state)
+        circuit_transitions.labels(self.name, self.state, state).inc()
+        self.state = state
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the breaker state for monitoring."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "open_for": time.monotonic() - self.opened_at if self.state == OPEN else 0.0,
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: a random delay up to base * 2**attempt, at most `cap`."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
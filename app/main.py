@@ -1,16 +1,24 @@
+import logging
 import os
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, inspect
 
 from app.api import api_router
-from app.api.dependencies.rate_limit import limiter
 from app.core.config import settings
-from app.db.session import get_db, engine
+from app.core.log import RequestIdMiddleware, setup_logging, stop_logging
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.resilience import STATE_VALUES
+from app.db.session import get_db, get_db_pool_stats, engine, read_engine
+from app.services.conversion import matrix_cache_stats
+from app.services.exchange_rate import exchange_rate_service
+from app.services.rate_limiter import rate_limiter
+from app.services.request_log import request_log_writer
+from app.services.user_cache import api_key_cache
 
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -28,10 +36,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure rate limiting
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Record per-route request latency and status counts
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, exclude_paths=("/metrics",))
 
+# Tag log records with the request id; added last so it wraps every other middleware
+app.add_middleware(RequestIdMiddleware)
 
 # Include the API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -51,6 +61,97 @@ async def root():
     }
 
 
+def collect_service_stats():
+    """
+    Export the counters the services already keep, sampled at scrape time.
+    """
+    caches = {
+        "rate_table": exchange_rate_service.rate_cache.stats(),
+        "api_key": api_key_cache.stats(),
+        "rate_matrix": matrix_cache_stats(),
+    }
+    yield "cache_hits_total", "counter", "Cache hits.", [({"cache": name}, stats["hits"]) for name, stats in caches.items()]
+    yield "cache_misses_total", "counter", "Cache misses.", [({"cache": name}, stats["misses"]) for name, stats in caches.items()]
+    yield "cache_hit_ratio", "gauge", "Cache hits / lookups since start.", [({"cache": name}, stats["hit_ratio"]) for name, stats in caches.items()]
+    yield "cache_entries", "gauge", "Entries held per cache.", [({"cache": name}, stats["entries"]) for name, stats in caches.items()]
+    
+    flights = exchange_rate_service.single_flight.stats()
+    yield "upstream_fetch_calls_total", "counter", "Provider fetches requested, before coalescing.", [({}, flights["calls"])]
+    yield "upstream_fetch_coalesced_total", "counter", "Provider fetches served by an in-flight request.", [({}, flights["coalesced"])]
+    
+    upstream = exchange_rate_service.get_pool_stats()
+    yield "upstream_pool_connections", "gauge", "Provider connections by state.", [
+        ({"state": "in_use"}, upstream["in_use"]),
+        ({"state": "idle"}, upstream["idle"]),
+    ]
+    yield "upstream_pool_new_connections_total", "counter", "Provider connections opened.", [({}, upstream["new_connections"])]
+    
+    breaker = exchange_rate_service.circuit_breaker
+    yield "circuit_breaker_state", "gauge", "Circuit state: 0 closed, 1 half-open, 2 open.", [({"circuit": breaker.name}, STATE_VALUES[breaker.state])]
+    
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    pools = {name: get_db_pool_stats(db_engine) for name, db_engine in engines.items()}
+    yield "db_pool_checked_out", "gauge", "Database connections in use.", [({"pool": name}, stats["checked_out"]) for name, stats in pools.items()]
+    yield "db_pool_overflow", "gauge", "Database connections open beyond the pool size.", [({"pool": name}, stats["overflow"]) for name, stats in pools.items()]
+    yield "db_pool_checkouts_total", "counter", "Database connection checkouts.", [({"pool": name}, stats["checkouts"]) for name, stats in pools.items()]
+    yield "db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a database connection.", [({"pool": name}, stats["total_wait"]) for name, stats in pools.items()]
+    yield "db_pool_timeouts_total", "counter", "Database connection checkouts that timed out.", [({"pool": name}, stats["timeouts"]) for name, stats in pools.items()]
+    
+    logs = request_log_writer.stats()
+    yield "request_log_queued", "gauge", "Request log rows waiting to be written.", [({}, logs["queued"])]
+    yield "request_log_rows_total", "counter", "Request log rows by outcome.", [
+        ({"outcome": "written"}, logs["written"]),
+        ({"outcome": "dropped"}, logs["dropped"]),
+        ({"outcome": "failed"}, logs["failed_rows"]),
+    ]
+    
+    snapshot = exchange_rate_service.get_snapshot_info()
+    if snapshot["version"] is not None:
+        yield "rate_snapshot_age_seconds", "gauge", "Age of the rate table being served.", [({}, snapshot["age"])]
+        yield "rate_snapshot_version", "gauge", "Version of the rate table being served.", [({}, snapshot["version"])]
+    yield "rate_snapshot_fresh", "gauge", "1 while the served rate table is before its next provider update.", [({}, int(snapshot["fresh"]))]
+    yield "rate_snapshot_expired", "gauge", "1 once the served rate table is past RATE_MAX_STALENESS, or none is held.", [({}, int(snapshot["expired"]))]
+
+
+async def metrics():
+    """
+    Expose metrics in the Prometheus text format.
+    """
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+if settings.METRICS_ENABLED:
+    registry.add_collector(collect_service_stats)
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+
+
+@app.on_event("startup")
+async def start_services():
+    """
+    Open the shared upstream HTTP connection pool, load the currency catalogue, start
+    refreshing rates in the background and start the request log writer.
+    """
+    await exchange_rate_service.start()
+    await exchange_rate_service.load_catalogue()
+    await request_log_writer.start()
+    if settings.RATE_REFRESH_ENABLED:
+        exchange_rate_service.start_refresher()
+
+
+@app.on_event("shutdown")
+async def stop_services():
+    """
+    Stop the background refresher, close the shared upstream HTTP connection pool,
+    flush any queued request logs and finally the log queue itself.
+    """
+    await exchange_rate_service.close()
+    await request_log_writer.stop()
+    await rate_limiter.close()
+    stop_logging()
+
+
 # Initialize database with default plans
 @app.on_event("startup")
 async def init_db():
@@ -69,7 +170,7 @@ async def init_db():
                 # If we got here, the table exists
             except Exception:
                 # Table doesn't exist yet, migrations need to run
-                print("Database tables not ready yet - will be created by migrations")
+                logger.info("Database tables not ready yet - will be created by migrations")
                 return
             
             # Check if plans already exist
@@ -77,7 +178,7 @@ async def init_db():
             plans = result.scalars().all()
             
             if not plans:
-                print("Creating default plans")
+                logger.info("Creating default plans")
                 # Create default plans
                 default_plans = [
                     Plan(name="Free", rate_limit=10, initial_credits=100),
@@ -89,8 +190,8 @@ async def init_db():
                     db.add(plan)
                 
                 await db.commit()
-                print("Default plans created successfully")
+                logger.info("Default plans created successfully")
         except Exception as e:
-            print(f"Error during database initialization: {e}")
+            logger.error("Error during database initialization: %s", e)
             # Don't raise the exception, just log it
             # This allows the app to start even if DB is not ready 
\ No newline at end of file
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, LargeBinary, UniqueConstraint
+
+from app.models.base import Base
+
+
+class HistoricalRate(Base):
+    """
+    One published rate table for a base currency on a given date.
+    Rates are packed float64 values in the order of the comma-separated codes;
+    an empty row records a date the provider still had no data for once it
+    was older than HISTORY_SETTLE_DAYS.
+    """
+    __table_args__ = (UniqueConstraint("base", "date", name="uq_historicalrate_base_date"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    base = Column(String(3), nullable=False)
+    date = Column(Date, nullable=False)
+    codes = Column(String, nullable=False, default="")
+    rates = Column(LargeBinary, nullable=False, default=b"")
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,7 +1,40 @@
+import sys
 from datetime import date
-from typing import Dict, List, Optional, Any
+from typing import Annotated, Dict, List, Optional, Union, Any
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field, field_validator, model_validator
+
+from app.services.currency_catalogue import get_current_catalogue
+
+
+def check_currency_code(value: str) -> str:
+    """
+    Normalize a currency code and check it against the in-memory currency
+    catalogue. Supported codes are returned as the catalogue's interned string.
+    """
+    code = value.strip().upper()
+    catalogue = get_current_catalogue()
+    if catalogue is None:
+        # Catalogue not loaded yet; the rate table lookup still rejects unknown codes
+        if len(code) != 3 or not code.isalpha():
+            raise ValueError(f"Invalid currency code: {value}")
+        return code
+    
+    if code not in catalogue.codes:
+        raise ValueError(f"Unsupported currency: {value}")
+    return sys.intern(code)
+
+
+def check_currency_codes(value: str) -> str:
+    """Normalize and check a comma-separated list of currency codes, dropping duplicates."""
+    codes = dict.fromkeys(check_currency_code(code) for code in value.split(",") if code.strip())
+    if not codes:
+        raise ValueError("At least one currency code is required")
+    return ",".join(codes)
+
+
+CurrencyCode = Annotated[str, AfterValidator(check_currency_code)]
+CurrencyCodeList = Annotated[str, AfterValidator(check_currency_codes)]
 
 
 class Currency(BaseModel):
@@ -14,13 +47,43 @@ class CurrencyList(BaseModel):
 
 
 class ConversionRequest(BaseModel):
-    from_currency: str = Field(..., description="Currency code to convert from")
-    to_currency: str = Field(..., description="Currency code to convert to")
+    from_currency: CurrencyCode = Field(..., description="Currency code to convert from")
+    to_currency: CurrencyCode = Field(..., description="Currency code to convert to")
     amount: float = Field(..., description="Amount to convert")
     start_date: Optional[date] = Field(None, description="Start date for historical data")
     end_date: Optional[date] = Field(None, description="End date for historical data")
 
 
+class ConversionQuery(BaseModel):
+    from_currency: CurrencyCode = Field(..., description="Currency code to convert from")
+    to_currency: CurrencyCode = Field(..., description="Currency code to convert to")
+    amount: float = Field(..., description="Amount to convert")
+
+
+class HistoricalConversionQuery(BaseModel):
+    from_currency: CurrencyCode = Field(..., description="Currency code to convert from")
+    to_currency: CurrencyCodeList = Field(..., description="Currency code to convert to, or several comma-separated codes")
+    amount: float = Field(..., description="Amount to convert")
+    start_date: date = Field(..., description="Start date (YYYY-MM-DD), must be within the last year")
+    end_date: date = Field(..., description="End date (YYYY-MM-DD), cannot be in the future")
+
+    @model_validator(mode="after")
+    def check_date_order(self) -> "HistoricalConversionQuery":
+        if self.start_date > self.end_date:
+            raise ValueError("Start date must be before or equal to end date")
+        return self
+
+
+class RateMatrixQuery(BaseModel):
+    bases: Optional[CurrencyCodeList] = Field(None, description="Comma-separated base currencies (default: all)")
+    targets: Optional[CurrencyCodeList] = Field(None, description="Comma-separated target currencies (default: all)")
+
+    @field_validator("bases", "targets", mode="before")
+    @classmethod
+    def blank_means_all(cls, value: Optional[str]) -> Optional[str]:
+        return value if value and value.strip(", ") else None
+
+
 class ConversionRate(BaseModel):
     rate: float
     date: Optional[date] = None
@@ -35,9 +98,32 @@ class ConversionResult(BaseModel):
     date: Optional[date] = None
 
 
+class BatchConversionItem(BaseModel):
+    from_currency: CurrencyCode = Field(..., alias="from", description="Currency code to convert from")
+    to_currency: CurrencyCode = Field(..., alias="to", description="Currency code to convert to")
+    amount: float = Field(..., description="Amount to convert")
+
+    class Config:
+        populate_by_name = True
+
+
+class BatchConversionResult(BaseModel):
+    results: List[ConversionResult]  # In request order
+
+
+class RateMatrix(BaseModel):
+    fingerprint: str  # Content hash of the rate snapshot the matrix was computed from
+    pivot: str
+    fetched_at: float
+    bases: List[str]
+    targets: List[str]
+    rates: List[float]  # Row-major: rates[i * len(targets) + j] converts bases[i] to targets[j]
+
+
 class HistoricalConversionResult(BaseModel):
     from_currency: str
     to_currency: str
     amount: float
     rates: Dict[str, Dict[str, float]]  # Date -> {currency: rate}
-    converted_amounts: Dict[str, float]  # Date -> converted amount 
\ No newline at end of file
+    # Date -> converted amount, or Date -> {currency: converted amount} for several targets
+    converted_amounts: Dict[str, Union[float, Dict[str, float]]] 
\ No newline at end of file
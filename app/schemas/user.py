@@ -63,4 +63,29 @@ class UserInfo(BaseModel):
     plan: PlanInDB
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+
+class CachedPlan(BaseModel):
+    id: int
+    name: str
+    rate_limit: int
+    initial_credits: int
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+class CachedUser(BaseModel):
+    """Immutable snapshot of an API user; the credit balance is always read from the database."""
+    id: int
+    email: str
+    api_key: str
+    is_active: bool
+    plan_id: Optional[int] = None
+    plan: Optional[CachedPlan] = None
+
+    class Config:
+        from_attributes = True
+        frozen = True
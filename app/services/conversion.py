@@ -0,0 +1,107 @@
+"""
+Vectorized conversion kernel.
+
+Works on the pivot rate vector of a RateTable (viewed as a NumPy float64
+array without copying) and on arrays of currency ids and amounts, so a
+whole batch, series or matrix is computed in one pass instead of one
+Python multiplication per element. Results follow the precision policy of
+app.services.rate_engine: one division per cross rate, one multiplication
+per amount, no intermediate rounding.
+"""
+import json
+from array import array
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.rate_engine import RateTable
+
+# Serialized matrices keyed by (table version, bases, targets); a new table version is a new key
+_matrix_cache: TTLCache[bytes] = TTLCache(
+    max_entries=settings.MATRIX_CACHE_MAX_ENTRIES,
+    default_ttl=settings.RATE_MAX_STALENESS,
+)
+
+
+def rate_vector(table: RateTable) -> np.ndarray:
+    """View the table's pivot rates as a float64 vector indexed by currency id."""
+    return np.frombuffer(table.rates, dtype=np.float64)
+
+
+def currency_ids(table: RateTable, codes: Sequence[str]) -> np.ndarray:
+    """Map currency codes to their ids in the table."""
+    try:
+        return np.fromiter(map(table.index.__getitem__, codes), dtype=np.intp, count=len(codes))
+    except KeyError as e:
+        raise Exception(f"Currency {e.args[0]} not supported")
+
+
+def convert_ids(
+    rates: np.ndarray,
+    from_ids: np.ndarray,
+    to_ids: np.ndarray,
+    amounts: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Array-backed core of convert_pairs: gather both legs, divide, scale."""
+    cross = rates[to_ids] / rates[from_ids]
+    return cross, amounts * cross
+
+
+def convert_pairs(
+    table: RateTable,
+    from_codes: Sequence[str],
+    to_codes: Sequence[str],
+    amounts: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert amounts between arbitrary pairs; returns the cross rates and converted amounts."""
+    return convert_ids(
+        rate_vector(table),
+        currency_ids(table, from_codes),
+        currency_ids(table, to_codes),
+        np.fromiter(amounts, dtype=np.float64, count=len(amounts)),
+    )
+
+
+def convert_series(rates: Sequence[float], amount: float) -> np.ndarray:
+    """Convert one amount at each rate of a series (e.g. one rate per date)."""
+    if isinstance(rates, array):
+        rates = np.frombuffer(rates, dtype=np.float64)
+    elif not isinstance(rates, np.ndarray):
+        rates = np.fromiter(rates, dtype=np.float64, count=len(rates))
+    return rates * amount
+
+
+def cross_rate_matrix(table: RateTable, bases: Sequence[str], targets: Sequence[str]) -> np.ndarray:
+    """Compute the row-major bases x targets matrix of cross rates in one step."""
+    rates = rate_vector(table)
+    return rates[currency_ids(table, targets)][np.newaxis, :] / rates[currency_ids(table, bases)][:, np.newaxis]
+
+
+def rate_matrix_json(table: RateTable, bases: Tuple[str, ...], targets: Tuple[str, ...]) -> bytes:
+    """
+    Serialize the cross-rate matrix of a table as compact JSON: the codes of
+    each axis plus a row-major array of rates[base][target]. The result is
+    memoized per table version, so repeated polls of the same snapshot only
+    copy the cached bytes. The response identifies the snapshot by its
+    fingerprint, which unlike the version is the same in every worker.
+    """
+    key = (table.version, bases, targets)
+    payload = _matrix_cache.get(key)
+    if payload is None:
+        matrix = cross_rate_matrix(table, bases, targets)
+        payload = json.dumps({
+            "fingerprint": table.fingerprint,
+            "pivot": table.pivot,
+            "fetched_at": table.fetched_at,
+            "bases": bases,
+            "targets": targets,
+            "rates": matrix.ravel().tolist(),
+        }, separators=(",", ":")).encode()
+        _matrix_cache.set(key, payload)
+    return payload
+
+
+def matrix_cache_stats():
+    return _matrix_cache.stats()
@@ -0,0 +1,71 @@
+"""
+Immutable catalogue of supported currencies.
+
+The provider's currency list almost never changes, so it is loaded once at
+startup, kept as a read-only mapping together with its serialized response
+body, and only refreshed in the background. When the provider cannot be
+reached, the snapshot bundled in app/data/currencies.json is served instead.
+"""
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import FrozenSet, Iterable, Mapping, Optional, Sequence
+
+# Snapshot of the provider's /codes response shipped with the application
+BUNDLED_CATALOGUE_PATH = Path(__file__).resolve().parent.parent / "data" / "currencies.json"
+
+# The catalogue being served, published by ExchangeRateService for request validation
+_current: Optional["CurrencyCatalogue"] = None
+
+
+class CurrencyCatalogue:
+    """Snapshot of the supported currency codes and names."""
+
+    __slots__ = ("currencies", "codes", "fingerprint", "payload", "loaded_at", "source")
+
+    def __init__(self, currencies: Mapping[str, str], source: str):
+        # Interned codes make membership checks on request parameters cheap
+        currencies = {sys.intern(code): name for code, name in currencies.items()}
+        self.currencies: Mapping[str, str] = MappingProxyType(currencies)
+        self.codes: FrozenSet[str] = frozenset(currencies)
+        self.payload: bytes = json.dumps(
+            {"currencies": currencies}, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+        self.fingerprint = hashlib.blake2b(self.payload, digest_size=8).hexdigest()
+        self.loaded_at = time.time()
+        self.source = source
+
+    @classmethod
+    def from_supported_codes(cls, supported_codes: Iterable[Sequence[str]], source: str) -> "CurrencyCatalogue":
+        """Build a catalogue from the provider's list of [code, name] pairs."""
+        return cls({code: name for code, name in supported_codes}, source)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.loaded_at
+
+    def supports(self, currency: str) -> bool:
+        return currency in self.codes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def get_current_catalogue() -> Optional[CurrencyCatalogue]:
+    """The catalogue currently served, or None before it is first loaded."""
+    return _current
+
+
+def set_current_catalogue(catalogue: CurrencyCatalogue):
+    global _current
+    _current = catalogue
+
+
+def load_bundled_catalogue(path: Path = BUNDLED_CATALOGUE_PATH) -> CurrencyCatalogue:
+    """Load the currency snapshot shipped with the application."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return CurrencyCatalogue.from_supported_codes(data["supported_codes"], source="bundled")
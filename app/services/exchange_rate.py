@@ -1,10 +1,104 @@
+import asyncio
 import httpx
 import json
-from datetime import date, datetime, timedelta
-from typing import Dict, List, Optional, Any
+import time
+from datetime import date, datetime, timedelta, timezone
+from importlib.util import find_spec
+from typing import Awaitable, Callable, Dict, Hashable, List, Mapping, Optional, Sequence, Any
 import logging
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import upstream_request_duration, upstream_retries
+from app.core.resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+from app.db.session import async_session
+from app.services import rate_history
+from app.services.currency_catalogue import CurrencyCatalogue, load_bundled_catalogue, set_current_catalogue
+from app.services.rate_engine import RateSeries, RateTable
+
+logger = logging.getLogger(__name__)
+
+# Provider responses worth retrying; they also count as failures for the circuit breaker
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class PoolStats:
+    """
+    Usage counters for the shared upstream connection pool.
+    Wait time is measured from the start of a request until the pool hands it
+    a connection (either a new TCP connect or the first write on a reused one).
+    """
+    
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.new_connections = 0
+    
+    def trace(self, started: float):
+        """Build an httpcore trace callback that records the pool wait for one request."""
+        acquired = False
+        
+        async def _trace(event_name: str, info: Dict[str, Any]):
+            nonlocal acquired
+            if acquired:
+                return
+            if event_name == "connection.connect_tcp.started":
+                self.new_connections += 1
+            elif not event_name.endswith("send_request_headers.started"):
+                return
+            acquired = True
+            wait = time.perf_counter() - started
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        
+        return _trace
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight fetch.
+    Callers that arrive while a fetch is running await its result instead of
+    issuing their own upstream request.
+    """
+    
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is None:
+            self.executions += 1
+            future = asyncio.ensure_future(fn())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        
+        # Shield the shared fetch so one cancelled caller doesn't cancel it for the others
+        return await asyncio.shield(future)
+    
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        """Return coalescing counters for monitoring."""
+        return {
+            "calls": self.calls,
+            "upstream_fetches": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
 
 
 class ExchangeRateService:
@@ -13,131 +107,554 @@ class ExchangeRateService:
     def __init__(self):
         self.api_key = settings.EXCHANGE_API_KEY
         self.base_url = settings.EXCHANGE_API_BASE_URL
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self.pool_stats = PoolStats()
+        self.pivot_currency = settings.RATE_PIVOT_CURRENCY
+        self.rate_cache: TTLCache[RateTable] = TTLCache(
+            max_entries=settings.RATE_CACHE_MAX_ENTRIES,
+            default_ttl=settings.RATE_CACHE_TTL,
+        )
+        self.single_flight = SingleFlight()
+        self.circuit_breaker = CircuitBreaker(
+            "exchange_rate_api",
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+        )
+        self.snapshot: Optional[RateTable] = None
+        self.catalogue: Optional[CurrencyCatalogue] = None
+        self._catalogue_checked_at = 0.0
+        self._refresher: Optional[asyncio.Task] = None
+        self._revalidation: Optional[asyncio.Task] = None
+        self._catalogue_revalidation: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Create the shared HTTP client. Called from the application startup hook."""
+        if self._client is None:
+            self._client = self._build_client()
+    
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            read=settings.HTTP_READ_TIMEOUT,
+            write=settings.HTTP_WRITE_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT,
+        )
+        # HTTP/2 needs the optional "h2" package; fall back to HTTP/1.1 keep-alive without it
+        http2 = settings.HTTP2_ENABLED and find_spec("h2") is not None
+        
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+        return httpx.AsyncClient(transport=self._transport, timeout=timeout)
+    
+    async def close(self):
+        """Close the shared HTTP client. Called from the application shutdown hook."""
+        await self.stop_refresher()
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._transport = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client; created lazily when used outside the application lifecycle."""
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+    
+    async def _get(self, method: str, url: str, params: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        Issue a GET to the provider within UPSTREAM_DEADLINE, retrying connection
+        errors, timeouts and retryable statuses with jittered backoff. Fails fast
+        with CircuitOpenError while the provider is considered unhealthy.
         
-    async def get_currencies(self) -> Dict[str, str]:
+        Each attempt's timeouts are capped at the time left before the deadline,
+        and an attempt cut off by the deadline counts as a failure, so a hung
+        provider opens the circuit like an erroring one.
+        
+        When retries run out on a retryable status, the last response is
+        returned so callers handle it as before.
+        """
+        breaker = self.circuit_breaker
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.UPSTREAM_DEADLINE
+        attempt = 0
+        while True:
+            breaker.before_call()
+            error: Optional[Exception] = None
+            response: Optional[httpx.Response] = None
+            remaining = max(deadline - loop.time(), 0.0)
+            try:
+                # httpx timeouts apply per operation; wait_for bounds the whole attempt
+                response = await asyncio.wait_for(
+                    self._request(method, url, params, self._attempt_timeout(remaining)),
+                    remaining,
+                )
+            except httpx.TransportError as e:
+                error = e
+            except asyncio.TimeoutError:
+                error = Exception(f"Provider {method} request exceeded the {settings.UPSTREAM_DEADLINE}s deadline")
+            except BaseException:
+                # Cancelled by the caller: let the next call probe instead
+                breaker.release()
+                raise
+            
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            
+            delay = backoff_delay(attempt, settings.UPSTREAM_RETRY_BASE_DELAY, settings.UPSTREAM_RETRY_MAX_DELAY)
+            if attempt >= settings.UPSTREAM_MAX_RETRIES or loop.time() + delay >= deadline:
+                if response is not None:
+                    return response
+                raise error
+            
+            attempt += 1
+            upstream_retries.labels(method).inc()
+            logger.debug(
+                "Retrying provider %s request in %.3fs (attempt %d): %s",
+                method, delay, attempt, error or response.status_code,
+            )
+            await asyncio.sleep(delay)
+    
+    def _attempt_timeout(self, remaining: float) -> httpx.Timeout:
+        """The client timeouts, capped at the time left before the call's deadline."""
+        return httpx.Timeout(
+            connect=min(settings.HTTP_CONNECT_TIMEOUT, remaining),
+            read=min(settings.HTTP_READ_TIMEOUT, remaining),
+            write=min(settings.HTTP_WRITE_TIMEOUT, remaining),
+            pool=min(settings.HTTP_POOL_TIMEOUT, remaining),
+        )
+    
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, str]],
+        timeout: Optional[httpx.Timeout] = None,
+    ) -> httpx.Response:
+        """
+        Issue a single GET on the shared client, recording pool usage and the request
+        time labelled by provider method (codes, latest, history) and status.
+        """
+        stats = self.pool_stats
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.client.get(
+                url,
+                params=params,
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                extensions={"trace": stats.trace(started)},
+            )
+            status = str(response.status_code)
+            return response
+        finally:
+            stats.in_flight -= 1
+            upstream_request_duration.labels(method, status).observe_since(started)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the upstream connection pool usage."""
+        stats = self.pool_stats
+        connections = []
+        pool = getattr(self._transport, "_pool", None)
+        if pool is not None:
+            connections = pool.connections
+        
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "idle": idle,
+            "in_use": len(connections) - idle,
+            "in_flight": stats.in_flight,
+            "max_in_flight": stats.max_in_flight,
+            "requests": stats.requests,
+            "new_connections": stats.new_connections,
+            "avg_wait_ms": (stats.total_wait / stats.requests * 1000) if stats.requests else 0.0,
+            "max_wait_ms": stats.max_wait * 1000,
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+        }
+        
+    async def get_currencies(self) -> Mapping[str, str]:
         """Get the list of supported currencies."""
-        async with httpx.AsyncClient() as client:
+        catalogue = await self.get_catalogue()
+        return catalogue.currencies
+    
+    async def get_catalogue(self) -> CurrencyCatalogue:
+        """
+        Get the currency catalogue loaded at startup. Once it is older than
+        CURRENCIES_REFRESH_INTERVAL (or RATE_REFRESH_RETRY_INTERVAL for the
+        bundled fallback) it is refreshed in the background, never inline.
+        """
+        catalogue = self.catalogue
+        if catalogue is None:
+            return await self.load_catalogue()
+        
+        interval = settings.CURRENCIES_REFRESH_INTERVAL if catalogue.source == "upstream" else settings.RATE_REFRESH_RETRY_INTERVAL
+        if time.time() - self._catalogue_checked_at > interval:
+            self._revalidate_catalogue()
+        return catalogue
+    
+    async def load_catalogue(self) -> CurrencyCatalogue:
+        """
+        Load the currency catalogue from the provider, falling back to the
+        bundled snapshot when it cannot be reached. Called from the
+        application startup hook.
+        """
+        try:
+            return await self.refresh_catalogue()
+        except Exception as e:
+            if self.catalogue is None:
+                logger.warning("Using bundled currency list: %s", e)
+                self._use_catalogue(load_bundled_catalogue())
+            return self.catalogue
+    
+    async def refresh_catalogue(self) -> CurrencyCatalogue:
+        """Fetch the currency list from the provider, sharing the request with any concurrent refresh."""
+        self._catalogue_checked_at = time.time()
+        return await self.single_flight.do(("codes",), self._fetch_currencies)
+    
+    def _revalidate_catalogue(self):
+        if self._catalogue_revalidation is None or self._catalogue_revalidation.done():
+            self._catalogue_revalidation = asyncio.ensure_future(self.refresh_catalogue())
+            self._catalogue_revalidation.add_done_callback(self._log_catalogue_refresh_failure)
+    
+    def _log_catalogue_refresh_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background currency list refresh failed: %s", task.exception())
+    
+    async def _fetch_currencies(self) -> CurrencyCatalogue:
+        try:
+            response = await self._get("codes", f"{self.base_url}{self.api_key}/codes")
+            
+            if response.status_code != 200:
+                raise Exception(f"API returned status code {response.status_code}")
+            
+            data = response.json()
+            
+            if data["result"] != "success":
+                raise Exception(f"API Error: {data.get('error', 'Unknown error')}")
+            
+            catalogue = CurrencyCatalogue.from_supported_codes(data["supported_codes"], source="upstream")
+        except json.JSONDecodeError:
+            raise Exception(f"Invalid JSON response from API: {response.text}")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Currency API error: {str(e)}")
+        
+        self._use_catalogue(catalogue)
+        return catalogue
+    
+    def _use_catalogue(self, catalogue: CurrencyCatalogue):
+        """Serve a new catalogue and publish it for request validation."""
+        self.catalogue = catalogue
+        set_current_catalogue(catalogue)
+    
+    async def get_rate_table(self) -> RateTable:
+        """
+        Get the latest pivot rate table, from which every pair is derived.
+        
+        A table past its refresh time is still served (and revalidated in the
+        background) until it exceeds RATE_MAX_STALENESS; the provider is only
+        called inline when no usable table is held.
+        """
+        table = self.rate_cache.get(self.pivot_currency)
+        if table is not None:
+            return table
+        
+        snapshot = self.snapshot
+        if snapshot is not None and not snapshot.is_expired:
+            self._revalidate()
+            return snapshot
+        
+        try:
+            return await self.refresh_rate_table()
+        except CircuitOpenError:
+            # The provider is down: an outdated table beats failing every conversion
+            if snapshot is None:
+                raise
+            logger.warning("Provider unavailable; serving rate table %s from %.0fs ago", snapshot.version, snapshot.age)
+            return snapshot
+    
+    async def refresh_rate_table(self) -> RateTable:
+        """Fetch a new pivot rate table, sharing the request with any concurrent refresh."""
+        return await self.single_flight.do(
+            ("latest", self.pivot_currency),
+            lambda: self._fetch_rate_table(self.pivot_currency),
+        )
+    
+    def _revalidate(self):
+        """Refresh a stale table in the background unless a refresh is already running."""
+        if self._revalidation is None or self._revalidation.done():
+            self._revalidation = asyncio.ensure_future(self.refresh_rate_table())
+            self._revalidation.add_done_callback(self._log_refresh_failure)
+    
+    def _log_refresh_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            if isinstance(task.exception(), CircuitOpenError):
+                # Already logged when the circuit opened
+                logger.debug("Background rate refresh skipped: %s", task.exception())
+            else:
+                logger.error("Background rate refresh failed: %s", task.exception())
+    
+    def start_refresher(self):
+        """Start the periodic background refresh of the rate table."""
+        if self._refresher is None:
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+    
+    async def stop_refresher(self):
+        """Stop the background refresh task."""
+        for task in (self._refresher, self._revalidation, self._catalogue_revalidation):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._refresher = None
+        self._revalidation = None
+        self._catalogue_revalidation = None
+    
+    async def _refresh_loop(self):
+        while True:
             try:
-                response = await client.get(f"{self.base_url}{self.api_key}/codes")
-                
-                if response.status_code != 200:
-                    raise Exception(f"API returned status code {response.status_code}")
-                
-                data = response.json()
-                
-                if data["result"] != "success":
-                    raise Exception(f"API Error: {data.get('error', 'Unknown error')}")
-                
-                # Convert the list of currency codes and names to a dictionary
-                currencies = {}
-                for code, name in data["supported_codes"]:
-                    currencies[code] = name
-                    
-                return currencies
-            except json.JSONDecodeError:
-                raise Exception(f"Invalid JSON response from API: {response.text}")
+                table = await self.refresh_rate_table()
+                delay = self._rate_table_ttl(table.next_update, settings.RATE_REFRESH_INTERVAL)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                raise Exception(f"Currency API error: {str(e)}")
+                logger.error("Background rate refresh failed: %s", e)
+                delay = settings.RATE_REFRESH_RETRY_INTERVAL
+            
+            await asyncio.sleep(delay)
+    
+    def get_snapshot_info(self) -> Dict[str, Any]:
+        """Describe the rate table currently being served."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {"version": None, "age": None, "fresh": False, "expired": True}
+        
+        return {
+            "version": snapshot.version,
+            "pivot": snapshot.pivot,
+            "fetched_at": snapshot.fetched_at,
+            "next_update": snapshot.next_update,
+            "age": snapshot.age,
+            "max_staleness": snapshot.max_staleness,
+            "fresh": snapshot.next_update is None or time.time() < snapshot.next_update,
+            "expired": snapshot.is_expired,
+        }
+    
+    async def _fetch_rate_table(self, base_currency: str) -> RateTable:
+        try:
+            response = await self._get("latest", f"{self.base_url}{self.api_key}/latest/{base_currency}")
+            
+            if response.status_code != 200:
+                raise Exception(f"API returned status code {response.status_code}")
+            
+            data = response.json()
+            
+            if data["result"] != "success":
+                raise Exception(f"API Error: {data.get('error', 'Unknown error')}")
+            
+            table = RateTable(
+                base_currency,
+                data["conversion_rates"],
+                next_update=data.get("time_next_update_unix"),
+                max_staleness=settings.RATE_MAX_STALENESS,
+            )
+        except json.JSONDecodeError:
+            raise Exception(f"Invalid JSON response from API: {response.text}")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Rate API error: {str(e)}")
+        
+        self.rate_cache.set(
+            base_currency,
+            table,
+            ttl=self._rate_table_ttl(table.next_update, settings.RATE_CACHE_TTL),
+        )
+        self.snapshot = table
+        return table
+    
+    def _rate_table_ttl(self, next_update: Optional[float], ttl: float) -> float:
+        """Keep a table until the provider publishes new rates, within the configured bounds."""
+        if next_update:
+            ttl = min(ttl, next_update - time.time())
+        return max(ttl, settings.RATE_CACHE_MIN_TTL)
     
     async def get_latest_rate(self, from_currency: str, to_currency: str) -> float:
         """Get the latest exchange rate from one currency to another."""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.base_url}{self.api_key}/latest/{from_currency}")
-                
-                if response.status_code != 200:
-                    raise Exception(f"API returned status code {response.status_code}")
-                
-                data = response.json()
-                
-                if data["result"] != "success":
-                    raise Exception(f"API Error: {data.get('error', 'Unknown error')}")
-                
-                # Get the conversion rate
-                conversion_rates = data["conversion_rates"]
-                if to_currency not in conversion_rates:
-                    raise Exception(f"Currency {to_currency} not supported")
-                
-                return conversion_rates[to_currency]
-            except json.JSONDecodeError:
-                raise Exception(f"Invalid JSON response from API: {response.text}")
-            except Exception as e:
-                raise Exception(f"Rate API error: {str(e)}")
+        table = await self.get_rate_table()
+        try:
+            return table.rate(from_currency, to_currency)
+        except Exception as e:
+            raise Exception(f"Rate API error: {str(e)}")
     
     async def get_historical_rates(
         self, 
         from_currency: str,
-        to_currency: str,
+        to_currencies: Sequence[str],
         start_date: date,
         end_date: date
-    ) -> Dict[str, Dict[str, float]]:
-        """Get historical exchange rates for a period."""
+    ) -> RateSeries:
+        """
+        Get historical exchange rates from one currency to one or more targets
+        for a period. Every target is derived from the same pivot tables, so
+        adding targets costs no extra upstream requests.
+        """
         # Make sure end_date is not in the future
         today = date.today()
         if end_date > today:
-            print(f"Adjusting end_date from {end_date} to {today} (cannot request future rates)")
+            logger.debug("Adjusting end_date from %s to %s (cannot request future rates)", end_date, today)
             end_date = today
             
         # Limit the date range to avoid API limitations
         # This API typically allows a maximum range of 1 year
         if start_date < today - timedelta(days=365):
             start_date = today - timedelta(days=365)
-            print(f"Adjusting start_date to {start_date} (API limit of 1 year of history)")
+            logger.debug("Adjusting start_date to %s (API limit of 1 year of history)", start_date)
             
-        # Format the dates as strings (YYYY-MM-DD)
-        start_date_str = start_date.strftime("%Y-%m-%d")
-        end_date_str = end_date.strftime("%Y-%m-%d")
-        
-        print(f"Requesting historical rates from {start_date_str} to {end_date_str}")
+        logger.debug("Requesting historical rates from %s to %s", start_date, end_date)
         
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.base_url}{self.api_key}/history/{from_currency}"
-                params = {"start_date": start_date_str, "end_date": end_date_str}
-                print(f"Making API request to: {url} with params: {params}")
-                
-                response = await client.get(url, params=params)
-                print(f"API response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    return self._handle_error_response(response)
-                
-                try:
-                    data = response.json()
-                except json.JSONDecodeError:
-                    raise Exception(f"Invalid JSON response from API: {response.text}")
-                
-                print(f"API response result: {data.get('result', 'no result field')}")
-                
-                if data["result"] != "success":
-                    error_msg = f"API Error: {data.get('error', 'Unknown error')}"
-                    print(error_msg)
-                    if data.get('error') == "unsupported_date":
-                        error_msg += ". The API may not support data this far back."
-                    elif "time_frame" in str(data.get('error', '')).lower():
-                        error_msg += ". The time frame is too large for this API."
-                    raise Exception(error_msg)
-                
-                # Extract the historical rates
-                historical_rates = {}
-                for date_str, rates in data["conversion_rates"].items():
-                    if to_currency in rates:
-                        if date_str not in historical_rates:
-                            historical_rates[date_str] = {}
-                        historical_rates[date_str][to_currency] = rates[to_currency]
-                
-                print(f"Retrieved rates for {len(historical_rates)} dates")
-                return historical_rates
+            tables = await self._get_history_tables(start_date, end_date)
+            
+            # Derive the requested pairs from the pivot table of each date
+            series = RateSeries(from_currency, to_currencies)
+            currencies = (from_currency, *to_currencies)
+            for day, table in tables.items():
+                if table is not None and all(table.supports(code) for code in currencies):
+                    series.append(day.strftime("%Y-%m-%d"), table)
+            
+            logger.debug("Retrieved rates for %d dates", len(series))
+            return series
                 
         except Exception as e:
-            print(f"Error in get_historical_rates: {str(e)}")
+            logger.warning("Error in get_historical_rates: %s", e)
             raise Exception(f"Failed to get historical rates: {str(e)}")
     
+    async def _get_history_tables(self, start_date: date, end_date: date) -> Dict[date, Optional[RateTable]]:
+        """
+        Get the pivot table for every date in a range, in date order.
+        Dates already in the local store are served from it; the missing dates
+        are requested from the provider in one span and then stored.
+        """
+        base = self.pivot_currency
+        tables = await self._load_stored_history(base, start_date, end_date)
+        
+        missing = []
+        day = start_date
+        while day <= end_date:
+            if day not in tables:
+                missing.append(day)
+            day += timedelta(days=1)
+        
+        if missing:
+            logger.debug("Fetching %d missing dates from %s to %s", len(missing), missing[0], missing[-1])
+            tables.update(await self._fetch_history_span(base, missing))
+        
+        return dict(sorted(tables.items()))
+    
+    async def _fetch_history_span(self, base: str, missing: List[date]) -> Dict[date, Optional[RateTable]]:
+        """
+        Fetch the span from the first to the last missing date in one request,
+        and persist the missing dates that can no longer change.
+        """
+        start_date_str = missing[0].strftime("%Y-%m-%d")
+        end_date_str = missing[-1].strftime("%Y-%m-%d")
+        
+        # Concurrent requests for the same base and range share one upstream call
+        conversion_rates = await self.single_flight.do(
+            ("history", base, start_date_str, end_date_str),
+            lambda: self._fetch_history(base, start_date_str, end_date_str),
+        )
+        
+        tables: Dict[date, Optional[RateTable]] = {}
+        published: Dict[date, Optional[Dict[str, float]]] = {}
+        # The provider publishes by UTC day; the server's local date may already be ahead
+        today = datetime.now(timezone.utc).date()
+        settled = today - timedelta(days=settings.HISTORY_SETTLE_DAYS)
+        for day in missing:
+            rates = conversion_rates.get(day.strftime("%Y-%m-%d"))
+            tables[day] = RateTable(base, rates) if rates else None
+            # Today's rates may still be revised. A date without rates may not be published
+            # yet, so it is only stored as "no data" once it is older than the settle window.
+            if (rates and day < today) or day < settled:
+                published[day] = rates
+        
+        await self._store_history(base, published)
+        return tables
+    
+    async def _load_stored_history(self, base: str, start_date: date, end_date: date) -> Dict[date, Optional[RateTable]]:
+        if not settings.HISTORY_STORE_ENABLED:
+            return {}
+        try:
+            async with async_session() as db:
+                return await rate_history.get_stored_rates(db, base, start_date, end_date)
+        except Exception as e:
+            # The store is an optimisation; fall back to the provider if it is unavailable
+            logger.warning("Historical rate store unavailable: %s", e)
+            return {}
+    
+    async def _store_history(self, base: str, tables: Dict[date, Optional[Dict[str, float]]]):
+        if not settings.HISTORY_STORE_ENABLED or not tables:
+            return
+        try:
+            async with async_session() as db:
+                await rate_history.store_rates(db, base, tables)
+        except Exception as e:
+            logger.error("Failed to store historical rates: %s", e)
+    
+    async def _fetch_history(
+        self,
+        base_currency: str,
+        start_date_str: str,
+        end_date_str: str
+    ) -> Dict[str, Dict[str, float]]:
+        """Fetch the full historical rate tables for a base currency and date range."""
+        url = f"{self.base_url}{self.api_key}/history/{base_currency}"
+        params = {"start_date": start_date_str, "end_date": end_date_str}
+        # The URL carries the provider API key, so only the base currency is logged
+        logger.debug("Requesting history for %s with params %s", base_currency, params)
+        
+        response = await self._get("history", url, params=params)
+        logger.debug("History response status: %d", response.status_code)
+        
+        if response.status_code != 200:
+            return self._handle_error_response(response)
+        
+        try:
+            data = response.json()
+        except json.JSONDecodeError:
+            raise Exception(f"Invalid JSON response from API: {response.text}")
+        
+        if data["result"] != "success":
+            error_msg = f"API Error: {data.get('error', 'Unknown error')}"
+            logger.warning("History request for %s failed: %s", base_currency, error_msg)
+            if data.get('error') == "unsupported_date":
+                error_msg += ". The API may not support data this far back."
+            elif "time_frame" in str(data.get('error', '')).lower():
+                error_msg += ". The time frame is too large for this API."
+            raise Exception(error_msg)
+        
+        return data["conversion_rates"]
+    
     def _handle_error_response(self, response):
         """Handle error responses from the API."""
         if response.status_code == 404:
             # For 404 errors, return an empty result set rather than failing
-            print(f"API returned 404, returning empty result set")
+            logger.debug("API returned 404, returning empty result set")
             return {}
         else:
             # For other errors, raise an exception
@@ -0,0 +1,139 @@
+"""
+Cross-rate engine backed by a single pivot rate table.
+
+One upstream table quoted against the pivot currency (e.g. USD) serves every
+pair: the rate from A to B is rate[B] / rate[A].
+
+Precision policy:
+- Pivot rates are stored exactly as published, as IEEE-754 doubles.
+- A cross rate is one double division with no intermediate rounding, so it
+  adds at most one ulp (~1e-16 relative) on top of the precision of the
+  two published quotes. It can differ from the provider's own direct quote
+  for that pair in the last published digit.
+- Identity pairs return exactly 1.0 and pivot legs return the published
+  quote unchanged.
+- Results are not rounded; rounding for display is left to the client.
+"""
+import hashlib
+import itertools
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_versions = itertools.count(1)
+
+
+def _fingerprint(pivot: str, codes: Tuple[str, ...], rates: array) -> str:
+    """
+    Hash of a table's contents. Unlike the version, which counts tables built
+    by this process, it is the same in every worker holding the same rates.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(pivot.encode())
+    digest.update(",".join(codes).encode())
+    digest.update(rates.tobytes())
+    return digest.hexdigest()
+
+
+class RateTable:
+    """Immutable snapshot of rates quoted against a single pivot currency."""
+
+    __slots__ = (
+        "pivot", "codes", "index", "rates", "version", "fingerprint", "fetched_at", "next_update", "max_staleness",
+    )
+
+    def __init__(
+        self,
+        pivot: str,
+        conversion_rates: Dict[str, float],
+        next_update: Optional[float] = None,
+        max_staleness: float = float("inf"),
+    ):
+        self.pivot = pivot
+        self.codes: Tuple[str, ...] = tuple(sorted(conversion_rates))
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self.rates = array("d", (float(conversion_rates[code]) for code in self.codes))
+        self.version = next(_versions)
+        self.fingerprint = _fingerprint(pivot, self.codes, self.rates)
+        self.fetched_at = time.time()
+        self.next_update = next_update
+        self.max_staleness = max_staleness
+
+    @classmethod
+    def from_columns(
+        cls,
+        pivot: str,
+        codes: Tuple[str, ...],
+        rates: array,
+        index: Optional[Dict[str, int]] = None,
+    ) -> "RateTable":
+        """Build a table from already sorted codes and their packed rates, sharing the code index."""
+        table = cls.__new__(cls)
+        table.pivot = pivot
+        table.codes = codes
+        table.index = index if index is not None else {code: i for i, code in enumerate(codes)}
+        table.rates = rates
+        table.version = next(_versions)
+        table.fingerprint = _fingerprint(pivot, codes, rates)
+        table.fetched_at = time.time()
+        table.next_update = None
+        table.max_staleness = float("inf")
+        return table
+
+    @property
+    def age(self) -> float:
+        """Seconds since the table was fetched from the provider."""
+        return time.time() - self.fetched_at
+
+    @property
+    def is_expired(self) -> bool:
+        """Whether the table is too old to be served at all."""
+        return self.age > self.max_staleness
+
+    def supports(self, currency: str) -> bool:
+        return currency in self.index
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        """Get the cross rate between two currencies."""
+        rates = self.rates
+        return rates[self._position(to_currency)] / rates[self._position(from_currency)]
+
+    def _position(self, currency: str) -> int:
+        try:
+            return self.index[currency]
+        except KeyError:
+            raise Exception(f"Currency {currency} not supported")
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class RateSeries:
+    """
+    Rates from one base currency to a set of targets over a range of dates,
+    stored column-wise: one list of dates plus one packed array of doubles
+    per target, instead of a dict of boxed floats per date.
+    """
+
+    __slots__ = ("base", "dates", "columns")
+
+    def __init__(self, base: str, targets: Sequence[str]):
+        self.base = base
+        self.dates: List[str] = []
+        self.columns: Dict[str, array] = {code: array("d") for code in targets}
+
+    @property
+    def targets(self) -> Tuple[str, ...]:
+        return tuple(self.columns)
+
+    def append(self, day: str, table: RateTable):
+        """Add one date, taking every target's cross rate from that date's pivot table."""
+        rates = table.rates
+        index = table.index
+        base_rate = rates[index[self.base]]
+        for code, column in self.columns.items():
+            column.append(rates[index[code]] / base_rate)
+        self.dates.append(day)
+
+    def __len__(self) -> int:
+        return len(self.dates)
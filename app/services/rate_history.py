@@ -0,0 +1,94 @@
+"""
+Local store of published historical rate tables.
+
+Historical rates never change once published, so every past (base, date)
+table fetched from the provider is kept in the historicalrate table and later
+requests only go upstream for the dates that are missing. Dates the provider
+has no rates for are kept as empty rows once they are older than
+HISTORY_SETTLE_DAYS, so permanent holes such as weekends are not requested
+again. A year of pivot tables for ~160 currencies is 365 rows of ~1.3 KB
+packed float64 rates.
+"""
+import sys
+from array import array
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.exchange_rate import HistoricalRate
+from app.services.rate_engine import RateTable
+
+# Code lists rarely change, so rows with the same codes share one index dict
+_code_indexes: Dict[str, Tuple[Tuple[str, ...], Dict[str, int]]] = {}
+
+
+def pack_rates(rates: Dict[str, float]) -> Tuple[str, bytes]:
+    """Pack a rate table into sorted codes and little-endian float64 bytes."""
+    codes = sorted(rates)
+    values = array("d", (float(rates[code]) for code in codes))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return ",".join(codes), values.tobytes()
+
+
+def unpack_rates(base: str, codes: str, packed: bytes) -> Optional[RateTable]:
+    """Rebuild a rate table from a stored row; empty rows mean the provider had no data."""
+    if not codes:
+        return None
+
+    if codes not in _code_indexes:
+        code_list = tuple(codes.split(","))
+        _code_indexes[codes] = (code_list, {code: i for i, code in enumerate(code_list)})
+    code_list, index = _code_indexes[codes]
+
+    values = array("d")
+    values.frombytes(packed)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return RateTable.from_columns(base, code_list, values, index)
+
+
+async def get_stored_rates(
+    db: AsyncSession,
+    base: str,
+    start_date: date,
+    end_date: date
+) -> Dict[date, Optional[RateTable]]:
+    """Get the stored tables for a base currency and date range, keyed by date."""
+    result = await db.execute(
+        select(HistoricalRate.date, HistoricalRate.codes, HistoricalRate.rates)
+        .where(
+            HistoricalRate.base == base,
+            HistoricalRate.date >= start_date,
+            HistoricalRate.date <= end_date,
+        )
+    )
+    return {day: unpack_rates(base, codes, packed) for day, codes, packed in result.all()}
+
+
+async def store_rates(
+    db: AsyncSession,
+    base: str,
+    tables: Dict[date, Optional[Dict[str, float]]]
+) -> None:
+    """
+    Store fetched tables, with None for a settled date without rates.
+    Dates already stored by a concurrent request are left as they are.
+    """
+    if not tables:
+        return
+
+    rows = []
+    for day, rates in tables.items():
+        codes, packed = pack_rates(rates) if rates else ("", b"")
+        rows.append({"base": base, "date": day, "codes": codes, "rates": packed})
+
+    await db.execute(
+        insert(HistoricalRate)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["base", "date"])
+    )
+    await db.commit()
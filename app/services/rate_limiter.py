@@ -0,0 +1,144 @@
+"""
+Rate limiting backends using GCRA (generic cell rate algorithm).
+
+A limit of N requests per period is enforced by tracking a single
+"theoretical arrival time" (TAT) per key: every allowed request pushes the
+TAT forward by period / N, and a request is rejected while the TAT is more
+than one period ahead of now. This allows bursts of up to N requests and
+then smooths to the sustained rate, with one value stored per key.
+
+The memory backend is per process. The Redis backend shares state across
+workers and hosts with one EVALSHA round-trip per check; it works with any
+server speaking the Redis protocol and supporting Lua scripts. If the
+server cannot be reached, enforce_rate_limit lets requests through.
+"""
+import math
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class RateLimitResult:
+    """Outcome of a rate limit check."""
+
+    __slots__ = ("allowed", "limit", "remaining", "retry_after", "reset_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: float, reset_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+        self.reset_after = reset_after
+
+
+def _result(allowed: bool, limit: int, period: float, interval: float, retry_after: float, tat_offset: float) -> RateLimitResult:
+    """Build a result from the GCRA state; tat_offset is how far the TAT is ahead of now."""
+    remaining = max(0, math.floor((period - tat_offset) / interval)) if allowed else 0
+    return RateLimitResult(allowed, limit, remaining, retry_after, max(tat_offset, 0.0))
+
+
+class RateLimiter:
+    """Interface for rate limiting backends."""
+
+    async def hit(self, key: str, limit: int, period: float) -> RateLimitResult:
+        """Count one request for a key against a limit of `limit` requests per `period` seconds."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryRateLimiter(RateLimiter):
+    """In-process GCRA limiter; each worker counts separately."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tats: Dict[str, float] = {}
+
+    async def hit(self, key: str, limit: int, period: float) -> RateLimitResult:
+        interval = period / limit
+        now = time.monotonic()
+
+        tat = max(self._tats.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - period
+        if now < allow_at:
+            return _result(False, limit, period, interval, allow_at - now, tat - now)
+
+        self._tats[key] = new_tat
+        if len(self._tats) > self.max_keys:
+            self._prune(now)
+        return _result(True, limit, period, interval, 0.0, new_tat - now)
+
+    def _prune(self, now: float):
+        """Drop keys whose TAT has passed; they are equivalent to unseen keys."""
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+
+
+# KEYS[1] = bucket key; ARGV = period and emission interval in milliseconds.
+# Uses the server clock so every worker agrees on "now".
+_GCRA_SCRIPT = """
+local period = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.max(1, math.ceil(new_tat - now)))
+return {1, 0, new_tat - now}
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """GCRA limiter shared across workers through a Redis-protocol server."""
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "ratelimit:", client: Any = None):
+        """Connect to `url`, or use `client`, an existing redis.asyncio client (or a stand-in)."""
+        if client is None:
+            # redis is only needed when this backend is configured
+            from redis import asyncio as aioredis
+
+            client = aioredis.from_url(url)
+
+        self.prefix = prefix
+        self._redis = client
+        self._script = self._redis.register_script(_GCRA_SCRIPT)
+
+    async def hit(self, key: str, limit: int, period: float) -> RateLimitResult:
+        period_ms = period * 1000
+        interval_ms = period_ms / limit
+        allowed, retry_after_ms, tat_offset_ms = await self._script(
+            keys=[self.prefix + key],
+            args=[period_ms, interval_ms],
+        )
+        return _result(
+            bool(allowed),
+            limit,
+            period,
+            interval_ms / 1000,
+            float(retry_after_ms) / 1000,
+            float(tat_offset_ms) / 1000,
+        )
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_rate_limiter(storage_url: Optional[str] = None) -> RateLimiter:
+    """Create the backend configured by RATE_LIMIT_STORAGE_URL (memory:// or redis://...)."""
+    url = storage_url if storage_url is not None else settings.RATE_LIMIT_STORAGE_URL
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimiter(url)
+    return MemoryRateLimiter()
+
+
+# Create a singleton instance of the limiter
+rate_limiter = create_rate_limiter()
@@ -0,0 +1,147 @@
+"""
+Batched, asynchronous writer for RequestLog rows.
+
+Handlers enqueue log rows without waiting on the database; a background
+worker inserts them in bulk whenever REQUEST_LOG_BATCH_SIZE rows are queued
+or REQUEST_LOG_FLUSH_INTERVAL seconds have passed. When the queue is full,
+writers wait up to REQUEST_LOG_ENQUEUE_TIMEOUT for space and the row is
+dropped (and counted) after that.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.metrics import request_log_commit_duration
+from app.db.session import async_session
+from app.models.user import RequestLog
+
+logger = logging.getLogger(__name__)
+
+_commit_timer = request_log_commit_duration.labels("batch")
+
+
+class RequestLogWriter:
+    """In-process sink that flushes request logs to the database in bulk."""
+
+    def __init__(
+        self,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        enqueue_timeout: float,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=max_queue)
+        self._worker: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.failed_rows = 0
+
+    async def start(self):
+        """Start the background flush worker. Called from the application startup hook."""
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the worker. Called from the shutdown hook."""
+        if self._worker is None:
+            return
+
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(self._worker, timeout)
+        except asyncio.TimeoutError:
+            logger.error("Request log writer did not drain within %ss; %d rows lost", timeout, self._queue.qsize())
+        self._worker = None
+
+    async def write(self, **fields: Any):
+        """Queue one RequestLog row; applies backpressure when the queue is full."""
+        fields.setdefault("created_at", datetime.utcnow())
+
+        # Without a running worker (e.g. in scripts) write the row directly
+        if self._worker is None:
+            await self._flush([fields])
+            return
+
+        try:
+            self._queue.put_nowait(fields)
+            return
+        except asyncio.QueueFull:
+            if self.enqueue_timeout <= 0:
+                self.dropped += 1
+                return
+
+        # Only a full queue pays for wait_for, which creates a task per call
+        try:
+            await asyncio.wait_for(self._queue.put(fields), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            entry = await self._queue.get()
+            if entry is None:
+                break
+
+            batch = [entry]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    closing = True
+                    break
+                batch.append(entry)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """Insert a batch of rows with one multi-row INSERT and one commit."""
+        started = time.perf_counter()
+        try:
+            async with async_session() as db:
+                await db.execute(insert(RequestLog), batch)
+                await db.commit()
+            _commit_timer.observe_since(started)
+            self.flushes += 1
+            self.written += len(batch)
+        except Exception as e:
+            self.failed_flushes += 1
+            self.failed_rows += len(batch)
+            logger.error("Failed to write %d request logs: %s", len(batch), e)
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue and flush counters for monitoring."""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "failed_rows": self.failed_rows,
+        }
+
+
+# Create a singleton instance of the writer
+request_log_writer = RequestLogWriter(
+    max_queue=settings.REQUEST_LOG_QUEUE_SIZE,
+    batch_size=settings.REQUEST_LOG_BATCH_SIZE,
+    flush_interval=settings.REQUEST_LOG_FLUSH_INTERVAL,
+    enqueue_timeout=settings.REQUEST_LOG_ENQUEUE_TIMEOUT,
+)
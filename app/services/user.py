@@ -1,10 +1,19 @@
-from sqlalchemy import select
+import time
+from typing import Optional
+
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.metrics import auth_lookup_duration, credit_deduction_duration
 from app.core.security import verify_password, get_password_hash, generate_api_key
+from app.db.session import async_read_session, engine, read_engine
 from app.models.user import User, Plan
-from app.schemas.user import UserCreate
+from app.schemas.user import UserCreate, CachedUser
+from app.services.user_cache import api_key_cache
+
+_auth_cache_timer = auth_lookup_duration.labels("cache")
+_auth_database_timer = auth_lookup_duration.labels("database")
 
 
 async def get_plan_by_id(db: AsyncSession, plan_id: int) -> Plan:
@@ -29,6 +38,39 @@ async def get_user_by_api_key(db: AsyncSession, api_key: str) -> User:
     return result.scalar_one_or_none()
 
 
+async def get_cached_user_by_api_key(db: AsyncSession, api_key: str) -> Optional[CachedUser]:
+    """Get a user snapshot by API key, only querying the database on a cache miss."""
+    started = time.perf_counter()
+    user = api_key_cache.get(api_key)
+    if user is not None:
+        _auth_cache_timer.observe_since(started)
+        return user
+    
+    if read_engine is not engine:
+        # Look the key up on the read replica with a short-lived session
+        async with async_read_session() as read_db:
+            db_user = await get_user_by_api_key(read_db, api_key)
+            if db_user:
+                user = CachedUser.model_validate(db_user)
+    
+    # Without a replica, or when the replica has not caught up with a new key yet
+    if user is None:
+        db_user = await get_user_by_api_key(db, api_key)
+        if db_user:
+            user = CachedUser.model_validate(db_user)
+    
+    _auth_database_timer.observe_since(started)
+    if user is not None:
+        api_key_cache.set(user)
+    return user
+
+
+async def get_user_credits(db: AsyncSession, user_id: int) -> int:
+    """Get the current credit balance of a user."""
+    result = await db.execute(select(User.credits).where(User.id == user_id))
+    return result.scalar_one_or_none() or 0
+
+
 async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
     """Create a new user."""
     # Get the plan
@@ -68,13 +110,39 @@ async def authenticate_user(db: AsyncSession, email: str, password: str) -> User
     return user
 
 
-async def deduct_credits(db: AsyncSession, user: User, credits: int) -> bool:
-    """Deduct credits from a user's account. Returns True if successful."""
-    if user.credits < credits:
-        return False
+async def deduct_credits(
+    db: AsyncSession,
+    user_id: int,
+    credits: int,
+    commit: bool = True
+) -> Optional[int]:
+    """
+    Deduct credits from a user's account.
+    Returns the remaining balance, or None if the user doesn't have enough credits.
     
-    user.credits -= credits
-    await db.commit()
-    await db.refresh(user)
+    The check and the decrement are one conditional UPDATE, so concurrent
+    requests can neither lose updates nor overdraw the account. With
+    commit=False the caller commits it together with its other writes.
+    """
+    started = time.perf_counter()
+    try:
+        return await _deduct_credits(db, user_id, credits, commit)
+    finally:
+        credit_deduction_duration.observe_since(started)
+
+
+async def _deduct_credits(db: AsyncSession, user_id: int, credits: int, commit: bool) -> Optional[int]:
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.credits >= credits)
+        .values(credits=User.credits - credits)
+        .returning(User.credits)
+        .execution_options(synchronize_session=False)
+    )
+    remaining = result.scalar_one_or_none()
+    if remaining is None:
+        return None
     
-    return True 
\ No newline at end of file
+    if commit:
+        await db.commit()
+    return remaining 
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+In-process cache of API key -> user and plan snapshots.
+
+Entries are invalidated when a user's API key, plan or active flag changes, or
+when a plan is updated, through the ORM hooks below. Those hooks only see
+changes made in this process, so other workers rely on API_KEY_CACHE_TTL to
+pick them up. Credit balances are never cached.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import Plan, User
+from app.schemas.user import CachedUser
+
+
+class ApiKeyCache:
+    """Bounded, TTL'd cache mapping API keys to immutable user snapshots."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._cache: TTLCache[CachedUser] = TTLCache(max_entries=max_entries, default_ttl=ttl)
+        self.invalidations = 0
+
+    def get(self, api_key: str) -> Optional[CachedUser]:
+        return self._cache.get(api_key)
+
+    def set(self, user: CachedUser):
+        self._cache.set(user.api_key, user)
+
+    def invalidate_api_key(self, api_key: str):
+        """Drop the entry for an API key, e.g. after it has been rotated."""
+        if self._cache.pop(api_key) is not None:
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop every entry for a user, e.g. after a plan change or deactivation."""
+        self.invalidations += self._cache.pop_where(lambda user: user.id == user_id)
+
+    def invalidate_plan(self, plan_id: int):
+        """Drop every entry on a plan whose limits have changed."""
+        self.invalidations += self._cache.pop_where(lambda user: user.plan_id == plan_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "invalidations": self.invalidations}
+
+
+api_key_cache = ApiKeyCache(
+    max_entries=settings.API_KEY_CACHE_MAX_ENTRIES,
+    ttl=settings.API_KEY_CACHE_TTL,
+)
+
+
+def _has_changes(target: Any, *attributes: str) -> bool:
+    state = inspect(target)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_updated_user(mapper, connection, target: User):
+    if _has_changes(target, "api_key", "plan_id", "is_active", "email"):
+        api_key_cache.invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User):
+    api_key_cache.invalidate_user(target.id)
+
+
+@event.listens_for(Plan, "after_update")
+def _invalidate_updated_plan(mapper, connection, target: Plan):
+    api_key_cache.invalidate_plan(target.id)
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: vectorized conversion kernel vs. the per-element Python loop.
+
+"lists" rows start from Python lists of codes and floats, as the JSON
+endpoints do, so they include converting the inputs to arrays; "arrays" rows
+start from array-backed ids and amounts and measure the kernel itself.
+
+Usage:
+    python -m benchmarks.bench_conversion [--size 1000000] [--currencies 160] [--repeat 5]
+"""
+import argparse
+import random
+import time
+from typing import Callable
+
+import numpy as np
+
+from app.services.conversion import (
+    convert_ids, convert_pairs, convert_series, cross_rate_matrix, currency_ids, rate_vector,
+)
+from app.services.rate_engine import RateTable
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def report(name: str, size: int, loop_time: float, kernel_time: float):
+    print(
+        f"{name:<14} {size:>10,} values | "
+        f"loop {size / loop_time / 1e6:8.2f} M/s | "
+        f"kernel {size / kernel_time / 1e6:8.2f} M/s | "
+        f"speedup {loop_time / kernel_time:6.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000, help="number of amounts to convert")
+    parser.add_argument("--currencies", type=int, default=160, help="number of currencies in the table")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    codes = [f"C{i:03d}" for i in range(args.currencies)]
+    conversion_rates = {code: rng.uniform(0.01, 500.0) for code in codes}
+    table = RateTable(codes[0], conversion_rates)
+
+    from_codes = [rng.choice(codes) for _ in range(args.size)]
+    to_codes = [rng.choice(codes) for _ in range(args.size)]
+    amounts = [rng.uniform(1.0, 10_000.0) for _ in range(args.size)]
+
+    # Pairs: the per-item loop used by /convert vs. one kernel pass (as in /convert/batch)
+    def pairs_loop():
+        return [
+            amount * (conversion_rates[to_code] / conversion_rates[from_code])
+            for from_code, to_code, amount in zip(from_codes, to_codes, amounts)
+        ]
+
+    pairs_loop_time = best_of(args.repeat, pairs_loop)
+    report("pairs/lists", args.size, pairs_loop_time,
+           best_of(args.repeat, lambda: convert_pairs(table, from_codes, to_codes, amounts)))
+
+    rates = rate_vector(table)
+    from_ids = currency_ids(table, from_codes)
+    to_ids = currency_ids(table, to_codes)
+    amount_array = np.array(amounts)
+    report("pairs/arrays", args.size, pairs_loop_time,
+           best_of(args.repeat, lambda: convert_ids(rates, from_ids, to_ids, amount_array)))
+
+    # Series: one amount at many rates, as in the /convert/historical loop
+    series_rates = [rng.uniform(0.5, 1.5) for _ in range(args.size)]
+    series_loop_time = best_of(args.repeat, lambda: [100.0 * rate for rate in series_rates])
+    report("series/lists", args.size, series_loop_time,
+           best_of(args.repeat, lambda: convert_series(series_rates, 100.0)))
+
+    series_array = np.array(series_rates)
+    report("series/arrays", args.size, series_loop_time,
+           best_of(args.repeat, lambda: convert_series(series_array, 100.0)))
+
+    # Matrix: all pairs of the table
+    def matrix_loop():
+        return [[conversion_rates[t] / conversion_rates[b] for t in codes] for b in codes]
+
+    report("matrix", args.currencies ** 2, best_of(args.repeat, matrix_loop),
+           best_of(args.repeat, lambda: cross_rate_matrix(table, codes, codes)))
+
+
+if __name__ == "__main__":
+    main()
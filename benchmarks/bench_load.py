@@ -0,0 +1,302 @@
+"""
+Load test: throughput, latency percentiles and DB queries per request.
+
+Drives the FastAPI app in-process (httpx's ASGI transport, so no sockets
+between client and app) with a fixed number of concurrent clients per
+endpoint. The exchange rate provider is the local fake in
+benchmarks/fake_provider.py, started in a subprocess unless --provider-url is
+given, so no run ever reaches the real provider or uses EXCHANGE_API_KEY.
+
+The database is DATABASE_URL, as for the app; tables are created if missing
+and a dedicated plan and user are added, with limits high enough not to
+throttle the run. Each endpoint is warmed up first, so the numbers are for a
+warm rate table and API key cache. DB queries include the request log rows,
+which are drained at the end of every run and amortised over its requests.
+
+Usage:
+    python -m benchmarks.bench_load [--concurrency 1,10,50] [--requests 500] [--endpoints convert,matrix]
+    DATABASE_URL=sqlite+aiosqlite:///bench.db python -m benchmarks.bench_load --provider-latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# name -> (HTTP method, path, query parameters, JSON body)
+Endpoint = Tuple[str, str, Optional[Dict[str, Any]], Optional[Any]]
+
+
+def endpoints(batch_size: int, history_days: int) -> Dict[str, Endpoint]:
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=history_days - 1)
+    pairs = [("USD", "EUR"), ("GBP", "JPY"), ("EUR", "CHF"), ("AUD", "CAD")]
+    return {
+        "currencies": ("GET", "/api/v1/currency/currencies", None, None),
+        "convert": (
+            "GET",
+            "/api/v1/currency/convert",
+            {"from_currency": "USD", "to_currency": "EUR", "amount": 100},
+            None,
+        ),
+        "batch": (
+            "POST",
+            "/api/v1/currency/convert/batch",
+            None,
+            [
+                {"from": source, "to": target, "amount": i + 1}
+                for i, (source, target) in zip(range(batch_size), pairs * batch_size)
+            ],
+        ),
+        "matrix": (
+            "GET",
+            "/api/v1/currency/matrix",
+            {"bases": "USD,EUR,GBP", "targets": "JPY,CHF,AUD,CAD"},
+            None,
+        ),
+        "historical": (
+            "GET",
+            "/api/v1/currency/convert/historical",
+            {
+                "from_currency": "USD",
+                "to_currency": "EUR",
+                "amount": 100,
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+            },
+            None,
+        ),
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_provider(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Start benchmarks.fake_provider on a free port and wait until it answers."""
+    port = free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.fake_provider",
+        "--port", str(port),
+        "--latency", str(args.provider_latency),
+        "--error-rate", str(args.provider_error_rate),
+        "--currencies", str(args.provider_currencies),
+    ]
+    process = subprocess.Popen(command)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/_stats", timeout=1).raise_for_status()
+            return process, f"{base_url}/v6/"
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Fake provider did not start")
+
+
+def provider_calls(provider_url: str) -> Optional[int]:
+    """Requests served by the fake provider so far, or None for another provider."""
+    try:
+        stats = httpx.get(provider_url.replace("/v6/", "/_stats"), timeout=1).json()
+        return stats["codes"] + stats["latest"] + stats["history"]
+    except (httpx.HTTPError, ValueError, KeyError):
+        return None
+
+
+async def create_bench_user() -> str:
+    """Create a plan without practical rate or credit limits and a user on it; return the API key."""
+    from sqlalchemy import select
+
+    from app.db.session import async_session, engine
+    from app.models.base import Base
+    from app.models.user import Plan
+    from app.schemas.user import UserCreate
+    from app.services.user import create_user
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        plan = (await db.execute(select(Plan).where(Plan.name == "Benchmark"))).scalar_one_or_none()
+        if plan is None:
+            plan = Plan(name="Benchmark", rate_limit=10 ** 9, initial_credits=2 * 10 ** 9)
+            db.add(plan)
+            await db.commit()
+            await db.refresh(plan)
+        user = await create_user(
+            db,
+            UserCreate(email=f"bench-{uuid.uuid4().hex[:12]}@example.com", password=uuid.uuid4().hex, plan_id=plan.id),
+        )
+        return user.api_key
+
+
+async def run_load(
+    client: httpx.AsyncClient, endpoint: Endpoint, concurrency: int, total: int
+) -> Tuple[float, List[float], Dict[int, int]]:
+    """Send `total` requests from `concurrency` clients; return wall time, latencies and status counts."""
+    method, path, params, body = endpoint
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.request(method, path, params=params, json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, statuses
+
+
+async def run(args: argparse.Namespace, provider_url: str) -> List[Dict[str, Any]]:
+    # Imported here so the environment set up in main() is what the settings see
+    from sqlalchemy import event
+
+    from app.db.session import engine, read_engine
+    from app.main import app
+    from app.services.request_log import request_log_writer
+
+    queries = [0]
+
+    def count_query(*_):
+        queries[0] += 1
+
+    for db_engine in {engine, read_engine}:
+        event.listen(db_engine.sync_engine, "before_cursor_execute", count_query)
+
+    api_key = await create_bench_user()
+    await app.router.startup()
+
+    results = []
+    selected = endpoints(args.batch_size, args.history_days)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers={"X-API-Key": api_key}, timeout=60
+        ) as client:
+            for name in args.endpoints:
+                endpoint = selected[name]
+                await run_load(client, endpoint, 1, args.warmup)
+
+                for concurrency in args.concurrency:
+                    await request_log_writer.stop()
+                    await request_log_writer.start()
+                    queries_before = queries[0]
+                    upstream_before = provider_calls(provider_url)
+
+                    wall, latencies, statuses = await run_load(client, endpoint, concurrency, args.requests)
+
+                    # Drain the request log so its inserts count towards this run
+                    await request_log_writer.stop()
+                    await request_log_writer.start()
+                    upstream_after = provider_calls(provider_url)
+
+                    latencies.sort()
+                    result = {
+                        "endpoint": name,
+                        "concurrency": concurrency,
+                        "requests": len(latencies),
+                        "throughput": len(latencies) / wall,
+                        "p50_ms": percentile(latencies, 0.50) * 1000,
+                        "p95_ms": percentile(latencies, 0.95) * 1000,
+                        "p99_ms": percentile(latencies, 0.99) * 1000,
+                        "errors": sum(count for code, count in statuses.items() if code >= 400),
+                        "statuses": statuses,
+                        "db_queries_per_request": (queries[0] - queries_before) / len(latencies),
+                        "upstream_calls": (
+                            upstream_after - upstream_before
+                            if upstream_before is not None and upstream_after is not None
+                            else None
+                        ),
+                    }
+                    results.append(result)
+                    report(result)
+    finally:
+        await app.router.shutdown()
+        for db_engine in {engine, read_engine}:
+            await db_engine.dispose()
+    return results
+
+
+def report(result: Dict[str, Any]):
+    upstream = result["upstream_calls"]
+    print(
+        f"{result['endpoint']:<11} c={result['concurrency']:<4} | "
+        f"{result['throughput']:8.1f} req/s | "
+        f"p50 {result['p50_ms']:7.2f} ms | p95 {result['p95_ms']:7.2f} ms | p99 {result['p99_ms']:7.2f} ms | "
+        f"errors {result['errors']:<4} | "
+        f"db {result['db_queries_per_request']:5.2f} q/req | "
+        f"upstream {'-' if upstream is None else upstream}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--endpoints", default="currencies,convert,batch,matrix,historical",
+        help="comma-separated endpoints to load (default: all)",
+    )
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="requests per endpoint before measuring")
+    parser.add_argument("--batch-size", type=int, default=100, help="conversions per batch request")
+    parser.add_argument("--history-days", type=int, default=30, help="days per historical request")
+    parser.add_argument("--provider-url", help="use a running provider (e.g. http://127.0.0.1:9100/v6/)")
+    parser.add_argument("--provider-latency", type=float, default=0.05, help="fake provider delay per request (s)")
+    parser.add_argument("--provider-error-rate", type=float, default=0.0, help="fake provider 503 rate")
+    parser.add_argument("--provider-currencies", type=int, default=162, help="currencies per fake rate table")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    unknown = set(args.endpoints) - set(endpoints(1, 1))
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    process = None
+    provider_url = args.provider_url
+    if provider_url is None:
+        process, provider_url = start_fake_provider(args)
+
+    os.environ["EXCHANGE_API_BASE_URL"] = provider_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    try:
+        results = asyncio.run(run(args, provider_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Micro-benchmark: diagnostics cost of one historical conversion request.
+
+get_historical_rates used to print six lines per request. This replays those
+six messages as:
+
+- "print": f-string formatting plus a synchronous write to a file, as before;
+- "debug off": logger.debug() calls with LOG_LEVEL=INFO (the default), which
+  stop at the level check without formatting anything;
+- "debug on": logger.debug() calls with the queue handler enabled; the
+  caller only builds the record and enqueues it, and the listener thread
+  formats and writes it.
+
+Times are the cost on the calling (event loop) thread per request. Output
+goes to os.devnull so the numbers leave out the log driver, which only makes
+the synchronous print path look better than it is in a container.
+
+Usage:
+    python -m benchmarks.bench_logging [--number 20000] [--repeat 5]
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from datetime import date
+from typing import Callable
+
+from app.core.log import JsonFormatter, RequestQueueHandler, request_id_var
+
+START, END, TODAY = date(2024, 1, 1), date(2024, 12, 31), date(2024, 12, 31)
+PARAMS = {"start_date": "2024-01-01", "end_date": "2024-12-31"}
+
+
+def best_of(repeat: int, number: int, fn: Callable[[], None]) -> float:
+    """Best time per call, in seconds, over `repeat` runs of `number` calls."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) / number)
+    return min(timings)
+
+
+def with_print(out) -> Callable[[], None]:
+    def request():
+        print(f"Adjusting end_date from {END} to {TODAY} (cannot request future rates)", file=out)
+        print(f"Requesting historical rates from {START} to {END}", file=out)
+        print(f"Making API request to: https://example.invalid/v6/KEY/history/USD with params: {PARAMS}", file=out)
+        print(f"API response status: {200}", file=out)
+        print(f"API response result: {'success'}", file=out)
+        print(f"Retrieved rates for {366} dates", file=out)
+
+    return request
+
+
+def with_logger(logger: logging.Logger) -> Callable[[], None]:
+    def request():
+        logger.debug("Adjusting end_date from %s to %s (cannot request future rates)", END, TODAY)
+        logger.debug("Requesting historical rates from %s to %s", START, END)
+        logger.debug("Requesting history for %s with params %s", "USD", PARAMS)
+        logger.debug("History response status: %d", 200)
+        logger.debug("Retrieved rates for %d dates", 366)
+        logger.debug("Fetching %d missing dates in %d upstream requests", 0, 0)
+
+    return request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="requests per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    request_id_var.set("0123456789abcdef")
+
+    with open(os.devnull, "w") as devnull:
+        stream_handler = logging.StreamHandler(devnull)
+        stream_handler.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        listener.start()
+
+        logger = logging.getLogger("bench.logging")
+        logger.addHandler(RequestQueueHandler(log_queue))
+        logger.propagate = False
+
+        results = {"print": best_of(args.repeat, args.number, with_print(devnull))}
+        logger.setLevel(logging.INFO)
+        results["debug off"] = best_of(args.repeat, args.number, with_logger(logger))
+        logger.setLevel(logging.DEBUG)
+        results["debug on"] = best_of(args.repeat, args.number, with_logger(logger))
+
+        listener.stop()
+
+    baseline = results["print"]
+    for name, seconds in results.items():
+        print(f"{name:<10} | {seconds * 1e6:8.2f} us/request | {baseline / seconds:6.1f}x vs print")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmark: response encoding of the currency endpoints.
+
+"validated" is FastAPI's default path for a handler returning a dict:
+validate it against the route's response_model, run jsonable_encoder and
+render a JSONResponse with stdlib json. "fast" is the FAST_JSON_ENABLED path:
+render the same dict with ORJSONResponse. Both start from the dict a handler
+returns and end with the encoded body, so the difference is the CPU saved per
+request.
+
+Usage:
+    python -m benchmarks.bench_serialization [--number 2000] [--repeat 5] [--days 365]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+from app.api.endpoints.currency import router
+
+
+async def best_of(repeat: int, number: int, fn: Callable[[], Awaitable[bytes]]) -> float:
+    """Best time per call, in seconds, over `repeat` runs of `number` calls."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        timings.append((time.perf_counter() - started) / number)
+    return min(timings)
+
+
+def response_field(path: str):
+    for route in router.routes:
+        if route.path == path:
+            return route.response_field
+    raise KeyError(path)
+
+
+def validated(path: str, content: Any) -> Callable[[], Awaitable[bytes]]:
+    field = response_field(path)
+
+    async def encode() -> bytes:
+        encoded = await serialize_response(field=field, response_content=content)
+        return JSONResponse(encoded).body
+
+    return encode
+
+
+def fast(content: Any) -> Callable[[], Awaitable[bytes]]:
+    async def encode() -> bytes:
+        return ORJSONResponse(content).body
+
+    return encode
+
+
+def report(name: str, validated_time: float, fast_time: float):
+    print(
+        f"{name:<26} | "
+        f"validated {validated_time * 1e6:9.1f} us | "
+        f"fast {fast_time * 1e6:9.1f} us | "
+        f"saved {(validated_time - fast_time) * 1e6:9.1f} us/request ({validated_time / fast_time:5.1f}x)"
+    )
+
+
+async def run(args: argparse.Namespace):
+    rng = random.Random(42)
+
+    convert = {
+        "from_currency": "USD",
+        "to_currency": "EUR",
+        "amount": 100.0,
+        "converted_amount": 91.83,
+        "rate": 0.9183,
+        "date": None,
+    }
+    currencies = {"currencies": {f"C{i:03d}": f"Currency number {i}" for i in range(args.currencies)}}
+
+    start = date.today() - timedelta(days=args.days - 1)
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(args.days)]
+    rates = [rng.uniform(0.8, 1.0) for _ in dates]
+    historical = {
+        "from_currency": "USD",
+        "to_currency": "EUR",
+        "amount": 100.0,
+        "rates": {day: {"EUR": rate} for day, rate in zip(dates, rates)},
+        "converted_amounts": {day: 100.0 * rate for day, rate in zip(dates, rates)},
+    }
+
+    for name, path, content, number in (
+        ("/convert", "/convert", convert, args.number),
+        ("/currencies", "/currencies", currencies, args.number // 10 or 1),
+        (f"/convert/historical {args.days}d", "/convert/historical", historical, args.number // 100 or 1),
+    ):
+        report(
+            name,
+            await best_of(args.repeat, number, validated(path, content)),
+            await best_of(args.repeat, number, fast(content)),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="calls per run for the small responses")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is reported)")
+    parser.add_argument("--days", type=int, default=365, help="dates in the historical response")
+    parser.add_argument("--currencies", type=int, default=160, help="currencies in the /currencies response")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
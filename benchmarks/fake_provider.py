@@ -0,0 +1,170 @@
+"""
+Local stand-in for the exchange rate provider.
+
+Serves the three endpoints ExchangeRateService calls, /codes, /latest/{base}
+and /history/{base}, under /v6/{api_key}/ like the real API, so the service
+only needs EXCHANGE_API_BASE_URL pointed at it. Rates are generated from a
+fixed seed, so every run returns the same data.
+
+Behaviour is configured with FAKE_PROVIDER_* environment variables, or with
+the matching options when started directly:
+
+- FAKE_PROVIDER_LATENCY: added delay per request, in seconds (default 0.05)
+- FAKE_PROVIDER_JITTER: random extra delay of up to this many seconds (default 0)
+- FAKE_PROVIDER_ERROR_RATE: fraction of requests answered with a 503 (default 0)
+- FAKE_PROVIDER_CURRENCIES: currencies per rate table (default 162, the bundled list)
+- FAKE_PROVIDER_SEED: seed for rates, latency jitter and errors (default 42)
+
+GET /_stats returns the number of requests served per endpoint.
+
+Usage:
+    python -m benchmarks.fake_provider [--port 9100] [--latency 0.05] [--error-rate 0.01]
+    EXCHANGE_API_BASE_URL=http://127.0.0.1:9100/v6/ uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import string
+import time
+from datetime import date, timedelta
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Response
+
+from app.services.currency_catalogue import load_bundled_catalogue
+
+
+class ProviderConfig:
+    """Fake provider behaviour, read from FAKE_PROVIDER_* environment variables."""
+
+    def __init__(self):
+        self.latency = float(os.environ.get("FAKE_PROVIDER_LATENCY", "0.05"))
+        self.jitter = float(os.environ.get("FAKE_PROVIDER_JITTER", "0"))
+        self.error_rate = float(os.environ.get("FAKE_PROVIDER_ERROR_RATE", "0"))
+        self.currencies = int(os.environ.get("FAKE_PROVIDER_CURRENCIES", "162"))
+        self.seed = int(os.environ.get("FAKE_PROVIDER_SEED", "42"))
+
+
+def make_currencies(count: int) -> List[Tuple[str, str]]:
+    """The bundled currency list, cut down or padded with made-up codes to `count` entries."""
+    currencies = sorted(load_bundled_catalogue().currencies.items())
+    # Keep USD, the default pivot, whatever the size
+    currencies.sort(key=lambda item: item[0] != "USD")
+    known = {code for code, _ in currencies}
+    for letters in product(string.ascii_uppercase, repeat=3):
+        if len(currencies) >= count:
+            break
+        code = "".join(letters)
+        if code not in known:
+            currencies.append((code, f"Test Currency {code}"))
+    return currencies[:max(count, 1)]
+
+
+config = ProviderConfig()
+rng = random.Random(config.seed)
+CURRENCIES = make_currencies(config.currencies)
+# Units per USD; every table is derived from these so cross rates stay consistent
+USD_RATES: Dict[str, float] = {code: 1.0 if code == "USD" else round(rng.uniform(0.05, 2000.0), 4) for code, _ in CURRENCIES}
+calls: Dict[str, int] = {"codes": 0, "latest": 0, "history": 0, "errors": 0}
+
+app = FastAPI(title="Fake exchange rate provider")
+
+
+def rates_for(base: str, day: Optional[date] = None) -> Dict[str, float]:
+    """Rates from `base` to every currency, drifting slightly from day to day."""
+    drift = 1.0 + 0.01 * math.sin(day.toordinal() / 7.0) if day else 1.0
+    base_rate = USD_RATES[base]
+    return {code: rate / base_rate * (1.0 if code == base else drift) for code, rate in USD_RATES.items()}
+
+
+async def simulate(endpoint: str) -> Optional[Response]:
+    """Count the call, wait the configured latency and maybe fail."""
+    calls[endpoint] += 1
+    delay = config.latency + rng.uniform(0, config.jitter)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    if config.error_rate and rng.random() < config.error_rate:
+        calls["errors"] += 1
+        return Response(status_code=503)
+    return None
+
+
+def unsupported_code() -> Dict[str, str]:
+    return {"result": "error", "error-type": "unsupported-code", "error": "unsupported-code"}
+
+
+@app.get("/v6/{api_key}/codes")
+async def codes(api_key: str):
+    error = await simulate("codes")
+    if error is not None:
+        return error
+    return {"result": "success", "supported_codes": [[code, name] for code, name in CURRENCIES]}
+
+
+@app.get("/v6/{api_key}/latest/{base}")
+async def latest(api_key: str, base: str):
+    error = await simulate("latest")
+    if error is not None:
+        return error
+    if base not in USD_RATES:
+        return unsupported_code()
+    now = int(time.time())
+    return {
+        "result": "success",
+        "base_code": base,
+        "time_last_update_unix": now - now % 86400,
+        "time_next_update_unix": now - now % 86400 + 86400,
+        "conversion_rates": rates_for(base),
+    }
+
+
+@app.get("/v6/{api_key}/history/{base}")
+async def history(api_key: str, base: str, start_date: date, end_date: date):
+    error = await simulate("history")
+    if error is not None:
+        return error
+    if base not in USD_RATES:
+        return unsupported_code()
+    days = (end_date - start_date).days + 1
+    return {
+        "result": "success",
+        "base_code": base,
+        "conversion_rates": {
+            (start_date + timedelta(days=i)).isoformat(): rates_for(base, start_date + timedelta(days=i))
+            for i in range(max(days, 0))
+        },
+    }
+
+
+@app.get("/_stats")
+async def stats():
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, help="random extra seconds per request, up to this value")
+    parser.add_argument("--error-rate", type=float, help="fraction of requests answered with a 503")
+    parser.add_argument("--currencies", type=int, help="currencies per rate table")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    for option in ("latency", "jitter", "error_rate", "currencies", "seed"):
+        value = getattr(args, option)
+        if value is not None:
+            os.environ[f"FAKE_PROVIDER_{option.upper()}"] = str(value)
+
+    import uvicorn
+
+    # Imported by string so the module is re-read with the options above applied
+    uvicorn.run("benchmarks.fake_provider:app", host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+# Settings and the database engines are read at import time, so configure them first
+_db_dir = tempfile.mkdtemp(prefix="currency-converter-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_db_dir}/test.db")
+os.environ.setdefault("RATE_REFRESH_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import socket
+import threading
+import time
+import uuid
+
+import pytest
+import uvicorn
+
+from app.db.session import async_session, engine
+from app.models.base import Base
+from app.models.user import Plan, User
+from benchmarks import fake_provider
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def provider_url():
+    """Base URL of the fake exchange rate provider, served over a real socket in a thread."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(fake_provider.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Fake provider did not start")
+        time.sleep(0.05)
+
+    yield f"http://127.0.0.1:{port}/v6/"
+
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def provider_config(monkeypatch):
+    """The fake provider's behaviour; changes are undone after the test."""
+    config = fake_provider.config
+    for attribute in ("latency", "jitter", "error_rate"):
+        monkeypatch.setattr(config, attribute, getattr(config, attribute))
+    config.latency = 0.0
+    return config
+
+
+@pytest.fixture
+async def db_user():
+    """A user with no credits on a plan with a high rate limit, in a fresh schema if needed."""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with async_session() as db:
+        plan = Plan(name=f"plan-{uuid.uuid4().hex}", rate_limit=1000, initial_credits=0)
+        user = User(email=f"{uuid.uuid4().hex}@example.com", api_key=uuid.uuid4().hex, credits=0, plan=plan)
+        db.add(user)
+        await db.commit()
+
+    yield user
+
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
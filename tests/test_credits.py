@@ -0,0 +1,97 @@
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import async_session
+from app.main import app
+from app.models.user import User
+from app.services.exchange_rate import exchange_rate_service
+from app.services.user import deduct_credits
+from benchmarks import fake_provider
+
+
+@pytest.fixture
+def user_id(db_user):
+    return db_user.id
+
+
+async def set_balance(user_id: int, credits: int):
+    async with async_session() as db:
+        user = await db.get(User, user_id)
+        user.credits = credits
+        await db.commit()
+
+
+async def get_balance(user_id: int) -> int:
+    async with async_session() as db:
+        return (await db.execute(select(User.credits).where(User.id == user_id))).scalar_one()
+
+
+@pytest.mark.anyio
+async def test_concurrent_deductions_never_overdraw(user_id):
+    balance = 25
+    attempts = 100
+    await set_balance(user_id, balance)
+
+    async def deduct():
+        async with async_session() as db:
+            return await deduct_credits(db, user_id, 1)
+
+    results = await asyncio.gather(*(deduct() for _ in range(attempts)))
+
+    successes = [remaining for remaining in results if remaining is not None]
+    assert len(successes) == balance
+    assert sorted(successes) == list(range(balance))
+    assert await get_balance(user_id) == 0
+
+
+@pytest.mark.anyio
+async def test_deduction_larger_than_balance_is_refused(user_id):
+    await set_balance(user_id, 3)
+
+    async with async_session() as db:
+        assert await deduct_credits(db, user_id, 5) is None
+        assert await deduct_credits(db, user_id, 3) == 0
+
+    assert await get_balance(user_id) == 0
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/api/v1/currency/convert", {"from_currency": "USD", "to_currency": "EUR", "amount": 1}),
+        (
+            "/api/v1/currency/convert/historical",
+            {
+                "from_currency": "USD",
+                "to_currency": "EUR",
+                "amount": 1,
+                "start_date": (date.today() - timedelta(days=30)).isoformat(),
+                "end_date": (date.today() - timedelta(days=20)).isoformat(),
+            },
+        ),
+    ],
+)
+async def test_unit_of_work_refuses_without_credits_before_upstream(
+    db_user, provider_url, provider_config, monkeypatch, path, params
+):
+    monkeypatch.setattr(settings, "DB_UNIT_OF_WORK", True)
+    monkeypatch.setattr(settings, "HISTORY_STORE_ENABLED", False)
+    monkeypatch.setattr(exchange_rate_service, "base_url", provider_url)
+    exchange_rate_service.rate_cache.clear()
+    exchange_rate_service.snapshot = None
+    calls = dict(fake_provider.calls)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"X-API-Key": db_user.api_key}) as client:
+        response = await client.get(path, params=params)
+    await exchange_rate_service.close()
+
+    assert response.status_code == 402
+    assert fake_provider.calls["latest"] == calls["latest"]
+    assert fake_provider.calls["history"] == calls["history"]
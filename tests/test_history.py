@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.services.exchange_rate import ExchangeRateService
+from app.services.rate_engine import RateTable
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """A service whose history store is a dict and whose provider skips weekends."""
+    monkeypatch.setattr(settings, "HISTORY_SETTLE_DAYS", 3)
+    service = ExchangeRateService()
+    service.store = {}
+    service.calls = []
+
+    async def fetch_history(base, start_date_str, end_date_str):
+        service.calls.append((start_date_str, end_date_str))
+        start, end = date.fromisoformat(start_date_str), date.fromisoformat(end_date_str)
+        days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+        return {day.isoformat(): {"USD": 1.0, "EUR": 0.9} for day in days if day.weekday() < 5}
+
+    async def load_stored_history(base, start_date, end_date):
+        return {
+            day: RateTable(base, rates) if rates else None
+            for day, rates in service.store.items()
+            if start_date <= day <= end_date
+        }
+
+    async def store_history(base, tables):
+        for day, rates in tables.items():
+            service.store.setdefault(day, rates)
+
+    monkeypatch.setattr(service, "_fetch_history", fetch_history)
+    monkeypatch.setattr(service, "_load_stored_history", load_stored_history)
+    monkeypatch.setattr(service, "_store_history", store_history)
+    return service
+
+
+@pytest.mark.anyio
+async def test_unsettled_dates_without_rates_are_not_stored(service):
+    today = utc_today()
+    missing = [today - timedelta(days=i) for i in range(2, -1, -1)]
+
+    tables = await service._fetch_history_span("USD", missing)
+
+    assert set(tables) == set(missing)
+    for day in missing:
+        assert (tables[day] is None) == (day.weekday() >= 5)
+    # Today may still be revised, and recent holes may not be published yet
+    assert set(service.store) == {day for day in missing if day < today and day.weekday() < 5}
+
+
+@pytest.mark.anyio
+async def test_settled_dates_without_rates_are_stored_empty(service):
+    end = utc_today() - timedelta(days=10)
+    missing = [end - timedelta(days=i) for i in range(13, -1, -1)]
+
+    await service._fetch_history_span("USD", missing)
+
+    assert set(service.store) == set(missing)
+    assert {day for day, rates in service.store.items() if rates is None} == {
+        day for day in missing if day.weekday() >= 5
+    }
+
+
+@pytest.mark.anyio
+async def test_repeated_range_does_not_go_upstream_again(service):
+    end = utc_today() - timedelta(days=5)
+    start = end - timedelta(days=364)
+
+    first = await service._get_history_tables(start, end)
+    second = await service._get_history_tables(start, end)
+
+    assert len(service.calls) == 1
+    assert first.keys() == second.keys()
+    assert [day for day, table in second.items() if table is None] == [
+        day for day in second if day.weekday() >= 5
+    ]
+
+
+@pytest.mark.anyio
+async def test_missing_dates_are_fetched_in_one_span(service):
+    end = utc_today() - timedelta(days=5)
+    start = end - timedelta(days=59)
+    # Every other week is already stored, leaving several gaps
+    for i in range(60):
+        day = start + timedelta(days=i)
+        if (i // 7) % 2 == 0:
+            service.store[day] = {"USD": 1.0, "EUR": 0.9}
+    missing = [start + timedelta(days=i) for i in range(60) if start + timedelta(days=i) not in service.store]
+
+    tables = await service._get_history_tables(start, end)
+
+    assert service.calls == [(missing[0].isoformat(), missing[-1].isoformat())]
+    assert len(tables) == 60
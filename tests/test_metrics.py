@@ -0,0 +1,28 @@
+from app.main import collect_service_stats
+from app.services.exchange_rate import exchange_rate_service
+from app.services.rate_engine import RateTable
+
+
+def snapshot_gauges():
+    return {
+        name: samples[0][1]
+        for name, _, _, samples in collect_service_stats()
+        if name.startswith("rate_snapshot_")
+    }
+
+
+def test_snapshot_gauges_without_a_table(monkeypatch):
+    monkeypatch.setattr(exchange_rate_service, "snapshot", None)
+
+    assert snapshot_gauges() == {"rate_snapshot_fresh": 0, "rate_snapshot_expired": 1}
+
+
+def test_snapshot_gauges_follow_the_served_table(monkeypatch):
+    table = RateTable("USD", {"USD": 1.0, "EUR": 0.9}, max_staleness=3600)
+    monkeypatch.setattr(exchange_rate_service, "snapshot", table)
+
+    gauges = snapshot_gauges()
+    assert gauges["rate_snapshot_version"] == table.version
+    assert 0 <= gauges["rate_snapshot_age_seconds"] < 60
+    assert gauges["rate_snapshot_fresh"] == 1
+    assert gauges["rate_snapshot_expired"] == 0
@@ -0,0 +1,68 @@
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from app.api.dependencies import rate_limit
+from app.core.metrics import rate_limiter_errors
+from app.schemas.user import CachedPlan, CachedUser
+from app.services.rate_limiter import MemoryRateLimiter, RedisRateLimiter
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def limiter(request):
+    if request.param == "memory":
+        limiter = MemoryRateLimiter()
+    else:
+        limiter = RedisRateLimiter(client=fakeredis.aioredis.FakeRedis())
+    yield limiter
+    await limiter.close()
+
+
+def make_user(rate_limit: int) -> CachedUser:
+    plan = CachedPlan(id=1, name="Test", rate_limit=rate_limit, initial_credits=0)
+    return CachedUser(id=1, email="user@example.com", api_key="key", is_active=True, plan_id=1, plan=plan)
+
+
+@pytest.mark.anyio
+async def test_burst_up_to_the_limit_then_reject(limiter):
+    results = [await limiter.hit("user:1", 5, 60) for _ in range(6)]
+
+    assert [result.allowed for result in results] == [True] * 5 + [False]
+    assert [result.remaining for result in results] == [4, 3, 2, 1, 0, 0]
+    # The next request is allowed once one emission interval (60 s / 5) has passed
+    assert 11 < results[-1].retry_after <= 12
+
+
+@pytest.mark.anyio
+async def test_keys_are_limited_separately(limiter):
+    assert (await limiter.hit("user:1", 1, 60)).allowed
+    assert not (await limiter.hit("user:1", 1, 60)).allowed
+    assert (await limiter.hit("user:2", 1, 60)).allowed
+
+
+@pytest.mark.anyio
+async def test_rejection_sends_retry_after(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    user = make_user(rate_limit=2)
+
+    for _ in range(2):
+        assert await rate_limit.enforce_rate_limit(user) is user
+    with pytest.raises(HTTPException) as rejected:
+        await rate_limit.enforce_rate_limit(user)
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers["Retry-After"] == "30"
+    assert rejected.value.headers["X-RateLimit-Remaining"] == "0"
+
+
+@pytest.mark.anyio
+async def test_unreachable_redis_fails_open(monkeypatch):
+    limiter = RedisRateLimiter(client=fakeredis.aioredis.FakeRedis(connected=False))
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    user = make_user(rate_limit=1)
+    errors = rate_limiter_errors.labels().value
+
+    for _ in range(3):
+        assert await rate_limit.enforce_rate_limit(user) is user
+
+    assert rate_limiter_errors.labels().value == errors + 3
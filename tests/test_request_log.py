@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.services.request_log import RequestLogWriter
+
+
+@pytest.fixture
+async def writer():
+    writer = RequestLogWriter(max_queue=2, batch_size=10, flush_interval=1.0, enqueue_timeout=0.05)
+    # A worker that never drains the queue, so the tests control when it is full
+    writer._worker = asyncio.get_running_loop().create_future()
+    yield writer
+    writer._worker.cancel()
+
+
+@pytest.mark.anyio
+async def test_write_with_room_does_not_wait(writer, monkeypatch):
+    async def wait_for(*args, **kwargs):
+        raise AssertionError("wait_for used while the queue had room")
+
+    monkeypatch.setattr(asyncio, "wait_for", wait_for)
+
+    await writer.write(endpoint="/convert")
+    await writer.write(endpoint="/convert")
+
+    assert writer._queue.qsize() == 2
+    assert writer.dropped == 0
+
+
+@pytest.mark.anyio
+async def test_full_queue_waits_for_space(writer):
+    await writer.write(endpoint="/convert")
+    await writer.write(endpoint="/convert")
+
+    asyncio.get_running_loop().call_later(0.01, writer._queue.get_nowait)
+    await writer.write(endpoint="/matrix")
+
+    assert writer._queue.qsize() == 2
+    assert writer.dropped == 0
+
+
+@pytest.mark.anyio
+async def test_full_queue_drops_after_the_timeout(writer):
+    for _ in range(3):
+        await writer.write(endpoint="/convert")
+
+    assert writer._queue.qsize() == 2
+    assert writer.dropped == 1
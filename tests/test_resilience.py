@@ -0,0 +1,63 @@
+import pytest
+
+from app.core.config import settings
+from app.core.resilience import OPEN, CircuitBreaker, CircuitOpenError
+from app.services.exchange_rate import ExchangeRateService
+
+
+@pytest.fixture
+def service(provider_url, monkeypatch):
+    monkeypatch.setattr(settings, "UPSTREAM_DEADLINE", 0.5)
+    monkeypatch.setattr(settings, "UPSTREAM_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(settings, "UPSTREAM_RETRY_MAX_DELAY", 0.02)
+    service = ExchangeRateService()
+    service.base_url = provider_url
+    service.circuit_breaker = CircuitBreaker("test_provider", failure_threshold=3, reset_timeout=60)
+    return service
+
+
+@pytest.mark.anyio
+async def test_slow_provider_opens_circuit(service, provider_config):
+    provider_config.latency = 5.0
+    try:
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await service.refresh_rate_table()
+        assert service.circuit_breaker.state == OPEN
+
+        # Further calls fail fast without waiting for the provider
+        with pytest.raises(CircuitOpenError):
+            await service.refresh_rate_table()
+    finally:
+        await service.close()
+
+
+@pytest.mark.anyio
+async def test_slow_attempt_is_retried_within_deadline(service, provider_config, monkeypatch):
+    # A read timeout well inside the deadline leaves room for retries
+    monkeypatch.setattr(settings, "HTTP_READ_TIMEOUT", 0.1)
+    provider_config.latency = 5.0
+    try:
+        with pytest.raises(Exception):
+            await service.refresh_rate_table()
+        assert service.circuit_breaker.failures > 1
+    finally:
+        await service.close()
+
+
+@pytest.mark.anyio
+async def test_open_circuit_serves_last_snapshot(service, provider_config):
+    try:
+        table = await service.get_rate_table()
+        service.rate_cache.clear()
+        table.max_staleness = 0
+
+        provider_config.latency = 5.0
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await service.refresh_rate_table()
+        assert service.circuit_breaker.state == OPEN
+
+        assert await service.get_rate_table() is table
+    finally:
+        await service.close()
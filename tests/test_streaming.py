@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app.api.endpoints.currency import _streaming_media_type
+from app.core.config import settings
+from app.db.session import async_session
+from app.main import app
+from app.models.user import User
+from app.services.exchange_rate import exchange_rate_service
+
+
+def request_accepting(accept):
+    headers = [] if accept is None else [(b"accept", accept.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, None),
+        ("*/*", None),
+        ("application/json", None),
+        ("text/csv", "text/csv"),
+        ("application/x-ndjson", "application/x-ndjson"),
+        ("text/csv;q=0, application/json", None),
+        ("text/csv; q=0.0, */*", None),
+        ("application/json, text/csv", None),
+        ("text/csv, application/json", "text/csv"),
+        ("application/json;q=0.5, text/csv", "text/csv"),
+        ("text/csv;q=0.4, application/x-ndjson;q=0.8", "application/x-ndjson"),
+        ("text/*", None),
+        ("text/csv, */*;q=0.1", "text/csv"),
+        ("TEXT/CSV;Q=1", "text/csv"),
+    ],
+)
+def test_streaming_media_type_negotiation(accept, expected):
+    assert _streaming_media_type(request_accepting(accept)) == expected
+
+
+@pytest.fixture
+async def client(db_user, provider_url, provider_config, monkeypatch):
+    monkeypatch.setattr(settings, "HISTORY_STORE_ENABLED", False)
+    monkeypatch.setattr(exchange_rate_service, "base_url", provider_url)
+    async with async_session() as db:
+        (await db.get(User, db_user.id)).credits = 100
+        await db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"X-API-Key": db_user.api_key}) as c:
+        yield c
+    await exchange_rate_service.close()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("accept", ["application/json", "application/x-ndjson", "text/csv"])
+async def test_historical_responses_vary_on_accept(client, accept):
+    end = date.today() - timedelta(days=20)
+    response = await client.get(
+        "/api/v1/currency/convert/historical",
+        params={
+            "from_currency": "USD",
+            "to_currency": "EUR",
+            "amount": 1,
+            "start_date": (end - timedelta(days=5)).isoformat(),
+            "end_date": end.isoformat(),
+        },
+        headers={"Accept": accept},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(accept)
+    assert response.headers["vary"] == "Accept"
@@ -0,0 +1,126 @@
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import async_session
+from app.main import app
+from app.models.user import User
+from app.services.currency_catalogue import load_bundled_catalogue, set_current_catalogue
+from app.services.exchange_rate import exchange_rate_service
+from app.services.rate_limiter import rate_limiter
+from benchmarks import fake_provider
+
+
+@pytest.fixture
+async def client(db_user, provider_url, provider_config, monkeypatch):
+    monkeypatch.setattr(exchange_rate_service, "base_url", provider_url)
+    set_current_catalogue(load_bundled_catalogue())
+    async with async_session() as db:
+        (await db.get(User, db_user.id)).credits = 100
+        await db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"X-API-Key": db_user.api_key}) as c:
+        yield c
+    await exchange_rate_service.close()
+
+
+async def credits_of(user: User) -> int:
+    async with async_session() as db:
+        return (await db.execute(select(User.credits).where(User.id == user.id))).scalar_one()
+
+
+def latest_calls() -> int:
+    return fake_provider.calls["latest"]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("params", [{"bases": "USD,XXX"}, {"targets": "EUR,usd,ZZZ"}])
+async def test_matrix_rejects_unsupported_codes_before_any_io(client, db_user, params):
+    exchange_rate_service.rate_cache.clear()
+    exchange_rate_service.snapshot = None
+    calls = latest_calls()
+
+    response = await client.get("/api/v1/currency/matrix", params=params)
+
+    assert response.status_code == 422
+    assert latest_calls() == calls
+    assert await credits_of(db_user) == 100
+
+
+@pytest.mark.anyio
+async def test_matrix_accepts_supported_codes(client, db_user):
+    response = await client.get("/api/v1/currency/matrix", params={"bases": "usd, eur", "targets": "GBP"})
+
+    assert response.status_code == 200
+    assert response.json()["bases"] == ["USD", "EUR"]
+    # Identified by content, so every worker serving the same snapshot agrees
+    fingerprint = exchange_rate_service.snapshot.fingerprint
+    assert response.json()["fingerprint"] == fingerprint
+    assert "version" not in response.json()
+    assert response.headers["etag"] == f'"rates-{fingerprint}"'
+    assert await credits_of(db_user) == 100 - settings.CREDITS_PER_MATRIX
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("size", [0, settings.BATCH_MAX_ITEMS + 1])
+async def test_batch_size_limits_are_422(client, db_user, size):
+    exchange_rate_service.rate_cache.clear()
+    exchange_rate_service.snapshot = None
+    calls = latest_calls()
+
+    response = await client.post(
+        "/api/v1/currency/convert/batch", json=[{"from": "USD", "to": "EUR", "amount": 1}] * size
+    )
+
+    assert response.status_code == 422
+    assert latest_calls() == calls
+    assert await credits_of(db_user) == 100
+
+
+@pytest.mark.anyio
+async def test_batch_rejects_unsupported_codes_before_any_io(client, db_user):
+    exchange_rate_service.rate_cache.clear()
+    exchange_rate_service.snapshot = None
+    calls = latest_calls()
+
+    response = await client.post(
+        "/api/v1/currency/convert/batch",
+        json=[{"from": "USD", "to": "EUR", "amount": 1}, {"from": "USD", "to": "XXX", "amount": 1}],
+    )
+
+    assert response.status_code == 422
+    assert latest_calls() == calls
+    assert await credits_of(db_user) == 100
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "method, path, params, body",
+    [
+        ("GET", "/api/v1/currency/convert", {"from_currency": "USD", "to_currency": "XXX", "amount": 1}, None),
+        ("GET", "/api/v1/currency/matrix", {"bases": "XXX"}, None),
+        (
+            "GET",
+            "/api/v1/currency/convert/historical",
+            {"from_currency": "USD", "to_currency": "EUR", "amount": 1, "start_date": "2024-02-01", "end_date": "2024-01-01"},
+            None,
+        ),
+        ("POST", "/api/v1/currency/convert/batch", None, []),
+        ("POST", "/api/v1/currency/convert/batch", None, [{"from": "USD", "to": "XXX", "amount": 1}]),
+    ],
+)
+async def test_invalid_requests_skip_the_rate_limiter(client, monkeypatch, method, path, params, body):
+    hits = []
+
+    async def hit(key, limit, period):
+        hits.append(key)
+        raise AssertionError("rate limiter called for an invalid request")
+
+    monkeypatch.setattr(rate_limiter, "hit", hit)
+
+    response = await client.request(method, path, params=params, json=body)
+
+    assert response.status_code == 422
+    assert hits == []